@@ -12,38 +12,59 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+# local imports
+from input_pipeline import make_dataset, make_train_val_datasets
+import mnist_store
+from quantization import quantization_report
+from distillation import distill
+from inference_server import MicroBatchServer
+
 class DigitClassificationModel:
     """
     This class creates a convolution neural network (CNN) that recognizes digits from the 
     MNIST dataset.
     """
 
-    def __init__(self):
+    def __init__(self, data_path: str | None = None, store_dir: str | None = None):
         """
         Initializes the class:
             - loads the dataset and separates into training and test set
             - creates the model for the CNN
+
+        The dataset is loaded from a local memory-mapped store (mnist_store.py), so
+        no network access is needed once the store or its source files exist.
+
+        Input:
+            data_path: mnist.npz file or folder of IDX files (defaults to keras' mnist.npz,
+                       downloaded with mnist.load_data() the first time if it's missing)
+            store_dir: folder of the memory-mapped store (defaults to '<data_path>_store')
         """
 
         # want to make sure the typing is correct so that I could use numpy functions
+        # images are kept as uint8 (28, 28) and labels as integer digits, the input
+        # pipeline adds the channel dimension and the Rescaling layer converts to float
         self.x_train: np.ndarray
         self.y_train: np.ndarray
         self.x_test: np.ndarray
         self.y_test: np.ndarray
-        (self.x_train, self.y_train) , (self.x_test, self.y_test) = mnist.load_data()
-
-        # change x_train and x_test dimensions to (60000, 28, 28, 1) for the convolution neural network
-        self.x_train_reshaped = self.x_train.reshape(60000, 28, 28, 1)
-        self.x_test_reshaped = self.x_test.reshape(10000, 28, 28, 1)
-
-        # change y_train and y_test to a binary output vector for better CNN processing
-        self.y_train_modified = keras.utils.to_categorical(self.y_train)
-        self.y_test_modified = keras.utils.to_categorical(self.y_test)
+        try:
+            (self.x_train, self.y_train) , (self.x_test, self.y_test) = mnist_store.load_data(
+                data_path or mnist_store.DEFAULT_SOURCE, store_dir)
+        except FileNotFoundError:
+            if data_path is not None:
+                raise
+            # first run on a machine with network access: download into keras' cache
+            mnist.load_data()
+            (self.x_train, self.y_train) , (self.x_test, self.y_test) = mnist_store.load_data(
+                mnist_store.DEFAULT_SOURCE, store_dir)
 
         # captures the model's loss after running model.fit() function
         self.model_train_history: keras.callbacks.History = None
         self.model_test_history: list = None
 
+        # small network trained by distill_model()
+        self.student_model: keras.Model = None
+
         # build the CNN model
         self.network_model = Sequential([
             Input(shape=(28, 28, 1)),
@@ -92,21 +113,30 @@ class DigitClassificationModel:
         Compiles the model with loss function, optimizer, and metric
         """
 
+        # sparse because the labels are digits instead of one-hot vectors
         self.network_model.compile(optimizer='adam',
-                                   loss='categorical_crossentropy',
+                                   loss='sparse_categorical_crossentropy',
                                    metrics=['accuracy'])
 
 
-    def train_model(self):
+    def train_model(self, epochs: int = 10, batch_size: int = 64, augment: bool = False):
         """
-        Train the CNN network.
+        Train the CNN network. The batches come from a shuffled, prefetched tf.data
+        pipeline (input_pipeline.py) so the next batch is ready while one is training.
+
+        Input:
+            epochs: number of passes over the training set
+            batch_size: number of images in each batch
+            augment: randomly shift and rotate the training images (in the pipeline's threads)
         """
 
-        self.model_train_history = self.network_model.fit(x=self.x_train_reshaped,
-                                                          y=self.y_train_modified,
-                                                          validation_split=0.25,
-                                                          epochs=10,
-                                                          batch_size=64)
+        train_dataset, val_dataset = make_train_val_datasets(self.x_train, self.y_train,
+                                                             validation_split=0.25,
+                                                             batch_size=batch_size,
+                                                             augment=augment)
+        self.model_train_history = self.network_model.fit(train_dataset,
+                                                          validation_data=val_dataset,
+                                                          epochs=epochs)
 
 
     def evaluate_model(self):
@@ -114,7 +144,7 @@ class DigitClassificationModel:
         Evaluate the CNN model on the test data.
         """
 
-        self.model_test_history = self.network_model.evaluate(x=self.x_test_reshaped, y=self.y_test_modified)
+        self.model_test_history = self.network_model.evaluate(make_dataset(self.x_test, self.y_test, batch_size=256))
         evaluation = pd.DataFrame({'Test Loss' : [self.model_test_history[0]*100],
                                    'Test Accuracy' : [self.model_test_history[1]*100]})
         evaluation.to_csv('~/Desktop/coding/ML_Projects/Image_Classification_CNN/Evaluation_Test_Scores.txt',
@@ -145,6 +175,81 @@ class DigitClassificationModel:
         plt.show()
 
 
+    def export_quantized_model(self, output_dir: str = 'export', num_calibration: int = 500) -> pd.DataFrame:
+        """
+        Converts the trained network to float32 and int8 TFLite models for CPU
+        inference (see quantization.py). The int8 model is calibrated on
+        num_calibration training images. Prints and returns the comparison of the
+        two models' test accuracy, size, latency and throughput.
+
+        Input:
+            output_dir: folder for the .tflite files and Quantization_Report.txt
+            num_calibration: number of training images used for calibration
+
+        Output: the report dataframe
+        """
+
+        report = quantization_report(self.network_model, self.x_train, self.x_test, self.y_test,
+                                     output_dir, num_calibration)
+        print(report.to_string(index=False))
+        return report
+
+
+    def distill_model(self,
+                      epochs: int = 10,
+                      temperature: float = 4.0,
+                      alpha: float = 0.1) -> pd.DataFrame:
+        """
+        Trains a small depthwise separable student network on the softened outputs of
+        this (trained) network, see distillation.py. The student is saved in
+        self.student_model and can be exported like the full network.
+
+        Input:
+            epochs: number of training epochs of the student
+            temperature: how much the teacher's outputs are softened
+            alpha: weight of the true label loss (the rest is the distillation loss)
+
+        Output: teacher vs student parameter count, test accuracy, latency and throughput
+        """
+
+        self.student_model, report = distill(self.network_model, self.x_train, self.y_train,
+                                             self.x_test, self.y_test, temperature=temperature,
+                                             alpha=alpha, epochs=epochs)
+        print(report.to_string(index=False))
+        return report
+
+
+    def save_model(self, path: str = 'digit_cnn.keras') -> str:
+        """
+        Saves the trained network so inference_server.py can load it without retraining.
+
+        Input:
+            path: .keras file path
+
+        Output: path of the saved model
+        """
+
+        self.network_model.save(path)
+        return path
+
+
+    def start_inference_server(self, max_batch_size: int = 32, max_latency_ms: float = 2.0) -> MicroBatchServer:
+        """
+        Starts a micro-batching inference server around the trained network (see
+        inference_server.py). Concurrent single image requests are run together in
+        batches of up to max_batch_size, waiting at most max_latency_ms for a batch
+        to fill. Call stop() on the server when done.
+
+        Input:
+            max_batch_size: largest number of requests run together
+            max_latency_ms: longest time a request waits for its batch to fill
+
+        Output: the started (and warmed up) server
+        """
+
+        return MicroBatchServer.from_keras(self.network_model, max_batch_size, max_latency_ms).start()
+
+
     def implement_gui(self):
         """
         Create a GUI for the user to draw a number and have the network predict what number it is and 
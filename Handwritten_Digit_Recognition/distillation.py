@@ -0,0 +1,237 @@
+"""
+Knowledge distillation of the digit CNN into a much smaller student network.
+
+The student is trained on a mix of two losses:
+- the usual sparse categorical crossentropy against the true labels
+- the KL divergence between the teacher's and the student's softened outputs,
+  softmax(logits / temperature). A temperature above 1 spreads the teacher's
+  probability over the digits it finds similar (ex. a 4 that looks a bit like a 9),
+  which tells the student more than the one correct label.
+
+The teacher's output is a softmax, so its logits are recovered as log(probabilities)
+(softmax is unchanged by the constant that's lost).
+
+Example:
+    student, report = distill(model.network_model, model.x_train, model.y_train,
+                              model.x_test, model.y_test)
+
+Smoke check (distills a tiny teacher for an epoch on 512 images):
+    python distillation.py --num-images 512
+"""
+
+# standard library imports
+import argparse
+import json
+import time
+
+# 3rd party imports
+import keras
+from keras import ops
+from keras.layers import (Dense, GlobalAveragePooling2D, Input, MaxPooling2D, Rescaling,
+                          SeparableConv2D, Softmax)
+import numpy as np
+import pandas as pd
+
+# local imports
+from input_pipeline import make_dataset, make_train_val_datasets
+
+
+def build_student(filters: tuple[int, ...] = (16, 32)) -> keras.Sequential:
+    """
+    Small depthwise separable CNN that outputs logits. A separable convolution
+    filters every channel on its own and then mixes the channels with a 1x1
+    convolution, which needs far fewer weights and multiplications than a full
+    Conv2D. Global average pooling replaces the Flatten + Dense 128 head.
+
+    Input:
+        filters: number of filters of every separable convolution block
+
+    Output: the student model (uncompiled)
+    """
+    layers = [Input(shape=(28, 28, 1)), Rescaling(scale=1./255)]
+    for num_filters in filters:
+        layers += [SeparableConv2D(filters=num_filters, kernel_size=3, activation='relu', padding='same'),
+                   MaxPooling2D()]
+    layers += [GlobalAveragePooling2D(), Dense(units=10)]
+    return keras.Sequential(layers, name='student')
+
+
+class Distiller(keras.Model):
+    """
+    Trains a student against a frozen teacher (see the module docstring). Calling it
+    runs the student, so metrics like accuracy are the student's. The teacher is only
+    frozen while fit runs, its trainable flag is restored afterwards.
+    """
+
+    def __init__(self, student: keras.Model, teacher: keras.Model, temperature: float = 4.0, alpha: float = 0.1):
+        """
+        Inputs:
+            student: model that outputs logits
+            teacher: trained model that outputs softmax probabilities
+            temperature: how much the outputs are softened
+            alpha: weight of the true label loss (1 - alpha is the distillation loss weight)
+        """
+        super().__init__()
+        self.student = student
+        self.teacher = teacher
+        self.temperature = temperature
+        self.alpha = alpha
+        self.student_loss_fn = keras.losses.SparseCategoricalCrossentropy(from_logits=True)
+        self.distillation_loss_fn = keras.losses.KLDivergence()
+
+
+    def fit(self, *args, **kwargs):
+        trainable = self.teacher.trainable
+        self.teacher.trainable = False # keeps the teacher's weights out of the optimizer
+        try:
+            return super().fit(*args, **kwargs)
+        finally:
+            self.teacher.trainable = trainable
+
+
+    def call(self, x, training=False):
+        return self.student(x, training=training)
+
+
+    def compute_loss(self, x=None, y=None, y_pred=None, sample_weight=None, training=True):
+        teacher_logits = ops.log(ops.clip(self.teacher(x, training=False), 1e-7, 1.0))
+        student_loss = self.student_loss_fn(y, y_pred)
+        distillation_loss = self.distillation_loss_fn(ops.softmax(teacher_logits / self.temperature),
+                                                      ops.softmax(y_pred / self.temperature))
+        # temperature**2 keeps the distillation gradients the same size for any temperature
+        return self.alpha * student_loss + (1 - self.alpha) * distillation_loss * self.temperature**2
+
+
+def benchmark_keras_model(model: keras.Model,
+                          x: np.ndarray,
+                          y: np.ndarray,
+                          batch_size: int = 256,
+                          num_latency_runs: int = 200) -> dict:
+    """
+    Measures a model's size, test accuracy, single image latency and batch throughput.
+
+    Inputs:
+        model: model that outputs probabilities (or logits)
+        x: uint8 test images
+        y: test labels
+        batch_size: batch size for the accuracy and throughput runs
+        num_latency_runs: number of single image calls timed
+
+    Output: dictionary of the results
+    """
+    dataset = make_dataset(x, y, batch_size=batch_size)
+    model.predict(dataset.take(1), verbose=0) # warm up
+
+    start = time.perf_counter()
+    outputs = model.predict(dataset, verbose=0)
+    seconds = time.perf_counter() - start
+
+    image = x[:1].reshape(1, 28, 28, 1)
+    model(image, training=False) # warm up
+    latencies = np.empty(num_latency_runs)
+    for i in range(num_latency_runs):
+        start = time.perf_counter()
+        model(image, training=False)
+        latencies[i] = time.perf_counter() - start
+
+    return {'Parameters': model.count_params(),
+            'Test Accuracy': float(np.mean(np.argmax(outputs, axis=1) == y)) * 100,
+            'Latency p50 (ms)': float(np.percentile(latencies, 50)) * 1e3,
+            'Latency p99 (ms)': float(np.percentile(latencies, 99)) * 1e3,
+            'Throughput (images/s)': x.shape[0] / seconds}
+
+
+def distill(teacher: keras.Model,
+            x_train: np.ndarray,
+            y_train: np.ndarray,
+            x_test: np.ndarray,
+            y_test: np.ndarray,
+            student: keras.Model | None = None,
+            temperature: float = 4.0,
+            alpha: float = 0.1,
+            epochs: int = 10,
+            batch_size: int = 64) -> tuple[keras.Sequential, pd.DataFrame]:
+    """
+    Distills the teacher into the student and compares them.
+
+    Inputs:
+        teacher: trained model that outputs softmax probabilities
+        x_train: uint8 training images
+        y_train: training labels
+        x_test: uint8 test images
+        y_test: test labels
+        student: model that outputs logits (defaults to build_student())
+        temperature: how much the outputs are softened
+        alpha: weight of the true label loss
+        epochs: number of training epochs
+        batch_size: number of images in each batch
+
+    Outputs:
+        student: the trained student with a softmax on the end (outputs probabilities
+                 like the teacher, so it can be used and exported the same way)
+        report: teacher vs student parameters, accuracy, latency and throughput
+    """
+    student = student if student is not None else build_student()
+    distiller = Distiller(student, teacher, temperature, alpha)
+    distiller.compile(optimizer='adam', metrics=[keras.metrics.SparseCategoricalAccuracy(name='accuracy')])
+
+    train_dataset, val_dataset = make_train_val_datasets(x_train, y_train, validation_split=0.25,
+                                                         batch_size=batch_size)
+    distiller.fit(train_dataset, validation_data=val_dataset, epochs=epochs)
+
+    student_model = keras.Sequential([student, Softmax()], name='student_softmax')
+    report = pd.DataFrame([{'Model': 'teacher', **benchmark_keras_model(teacher, x_test, y_test)},
+                           {'Model': 'student', **benchmark_keras_model(student_model, x_test, y_test)}])
+    report['Relative Parameters'] = report['Parameters'] / report['Parameters'].iloc[0]
+    report['Speedup'] = report['Latency p50 (ms)'].iloc[0] / report['Latency p50 (ms)']
+    return student_model, report
+
+
+def smoke_check(x_train: np.ndarray,
+                y_train: np.ndarray,
+                x_test: np.ndarray,
+                y_test: np.ndarray,
+                epochs: int = 1) -> pd.DataFrame:
+    """
+    Trains a tiny teacher and distills it into the default student for an epoch.
+    Checks that the teacher's weights and trainable flag are unchanged afterwards and
+    that the student outputs probabilities. Raises an AssertionError if a check fails.
+
+    Inputs:
+        x_train: a few uint8 training images
+        y_train: their labels
+        x_test: a few uint8 test images
+        y_test: their labels
+        epochs: number of training epochs (teacher and student)
+
+    Output: the distillation report
+    """
+    teacher = keras.Sequential([build_student(filters=(8,)), Softmax()], name='teacher')
+    teacher.compile(optimizer='adam', loss='sparse_categorical_crossentropy')
+    teacher.fit(make_dataset(x_train, y_train, shuffle=True, seed=0), epochs=epochs, verbose=0)
+    teacher_weights = [weights.copy() for weights in teacher.get_weights()]
+
+    student, report = distill(teacher, x_train, y_train, x_test, y_test, epochs=epochs, batch_size=32)
+
+    assert teacher.trainable, "distill left the teacher frozen"
+    assert all(np.array_equal(before, after) for before, after in zip(teacher_weights, teacher.get_weights())), \
+        "distill changed the teacher's weights"
+    probabilities = student.predict(x_test[..., np.newaxis], verbose=0)
+    assert probabilities.shape == (x_test.shape[0], 10) and np.allclose(probabilities.sum(axis=1), 1, atol=1e-4)
+    return report
+
+
+if __name__ == "__main__":
+
+    import mnist_store
+
+    parser = argparse.ArgumentParser(description='Smoke check of the distillation on a few MNIST images')
+    parser.add_argument('--data', default=mnist_store.DEFAULT_SOURCE, help='mnist.npz file or folder of IDX files')
+    parser.add_argument('--num-images', type=int, default=512, help='number of training images')
+    parser.add_argument('--num-test-images', type=int, default=128, help='number of test images')
+    args = parser.parse_args()
+
+    (x_train, y_train), (x_test, y_test) = mnist_store.load_data(args.data)
+    smoke_report = smoke_check(np.array(x_train[:args.num_images]), np.array(y_train[:args.num_images]),
+                               np.array(x_test[:args.num_test_images]), np.array(y_test[:args.num_test_images]))
+    print(json.dumps(smoke_report.to_dict(orient='records'), indent=2))
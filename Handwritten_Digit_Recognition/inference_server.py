@@ -0,0 +1,410 @@
+"""
+Micro-batching inference server for the digit model.
+
+Calling the keras model once per image costs a full framework call per request.
+The server loads and warms the model once, then a single worker thread collects
+the requests that arrive within max_latency_ms (or until max_batch_size requests
+are waiting) and runs them as one batch. The images are copied into a
+preallocated uint8 buffer that always has the same shape, so the compiled
+function is traced once and nothing is allocated per batch.
+
+Every request's latency (from submit to result) is recorded, and stats() reports
+p50 / p99 latency, throughput and the average batch size.
+
+Example:
+    with MicroBatchServer.from_keras(model.network_model) as server:
+        digit, probabilities = server.predict(image)
+        print(server.stats())
+
+From the command line (serves POST /predict with 784 raw uint8 pixels or a json
+list, and GET /stats):
+    python inference_server.py digit_cnn.keras --port 8000
+    python inference_server.py digit_cnn.keras --benchmark
+    python inference_server.py digit_cnn.keras --smoke   (quick check on 64 test images)
+"""
+
+# standard library imports
+import argparse
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# 3rd party imports
+import numpy as np
+
+
+class MicroBatchServer:
+    """
+    Runs concurrent single image requests in micro-batches (see the module docstring).
+    """
+
+    def __init__(self,
+                 predict_batch: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 32,
+                 max_latency_ms: float = 2.0,
+                 max_recorded: int = 100000):
+        """
+        Inputs:
+            predict_batch: function from a uint8 (max_batch_size, 28, 28, 1) batch to
+                           probabilities (max_batch_size, 10)
+            max_batch_size: largest number of requests run together
+            max_latency_ms: longest time the first request of a batch waits for more requests
+            max_recorded: number of request latencies kept for stats (the most recent ones)
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1e3
+        self.requests: queue.Queue = queue.Queue()
+
+        # preallocated input buffer and request slots, reused for every batch
+        self.buffer = np.zeros((max_batch_size, 28, 28, 1), dtype=np.uint8)
+        self.batch: list[tuple[float, Future]] = []
+
+        self.latencies = np.zeros(max_recorded)
+        self.num_requests = 0
+        self.num_batches = 0
+        self.start_time: float | None = None
+        self.worker: threading.Thread | None = None
+        self.running = False
+
+
+    @classmethod
+    def from_keras(cls, network_model, max_batch_size: int = 32, max_latency_ms: float = 2.0) -> 'MicroBatchServer':
+        """
+        Serves a keras model through a tf.function traced for the fixed batch shape,
+        which skips the per call overhead of model.predict.
+
+        Inputs:
+            network_model: trained keras model (uint8 or float input, probability output)
+            max_batch_size: largest number of requests run together
+            max_latency_ms: longest time the first request of a batch waits for more requests
+
+        Output: the (not started) server
+        """
+        import tensorflow as tf
+
+        @tf.function(input_signature=[tf.TensorSpec((max_batch_size, 28, 28, 1), tf.uint8)])
+        def predict(images):
+            return network_model(tf.cast(images, tf.float32), training=False)
+
+        return cls(lambda images: predict(images).numpy(), max_batch_size, max_latency_ms)
+
+
+    @classmethod
+    def from_tflite(cls, path: str, max_batch_size: int = 32, max_latency_ms: float = 2.0) -> 'MicroBatchServer':
+        """
+        Serves a .tflite model (ex. the int8 model from quantization.py).
+
+        Inputs:
+            path: .tflite model file
+            max_batch_size: largest number of requests run together
+            max_latency_ms: longest time the first request of a batch waits for more requests
+
+        Output: the (not started) server
+        """
+        from quantization import TFLiteClassifier
+
+        classifier = TFLiteClassifier(path, batch_size=max_batch_size)
+        return cls(classifier.predict_batch, max_batch_size, max_latency_ms)
+
+
+    def start(self) -> 'MicroBatchServer':
+        """
+        Warms up the model (the first call traces / allocates everything) and starts
+        the worker thread.
+        """
+        self.predict_batch(self.buffer)
+        self.running = True
+        self.start_time = time.perf_counter()
+        self.worker = threading.Thread(target=self._run, name='micro-batch-worker', daemon=True)
+        self.worker.start()
+        return self
+
+
+    def stop(self) -> None:
+        """
+        Stops the worker thread after the requests already submitted are answered.
+        """
+        self.running = False
+        self.requests.put(None)
+        if self.worker is not None:
+            self.worker.join()
+
+
+    def __enter__(self) -> 'MicroBatchServer':
+        return self.start()
+
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+    def submit(self, image: np.ndarray) -> Future:
+        """
+        Queues one image without waiting for the result.
+
+        Input:
+            image: uint8 image, shape (28, 28) or (28, 28, 1)
+
+        Output: future that resolves to the probabilities of the 10 digits
+        """
+        if not self.running:
+            raise RuntimeError("the server isn't running, call start() first")
+        future: Future = Future()
+        self.requests.put((np.asarray(image, dtype=np.uint8).reshape(28, 28, 1), time.perf_counter(), future))
+        return future
+
+
+    def predict(self, image: np.ndarray) -> tuple[int, np.ndarray]:
+        """
+        Predicts one image (waits for its micro-batch to run).
+
+        Input:
+            image: uint8 image, shape (28, 28) or (28, 28, 1)
+
+        Outputs:
+            digit: predicted digit
+            probabilities: probability of each digit
+        """
+        probabilities = self.submit(image).result()
+        return int(np.argmax(probabilities)), probabilities
+
+
+    def _collect_batch(self, first: tuple) -> None:
+        """
+        Copies the first request and every request that arrives before the deadline
+        (or until the batch is full) into the buffer.
+        """
+        self.batch.clear()
+        image, submitted, future = first
+        self.buffer[0] = image
+        self.batch.append((submitted, future))
+
+        deadline = time.perf_counter() + self.max_latency
+        while len(self.batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None: # stop() was called, answer this batch first
+                self.requests.put(None)
+                break
+            image, submitted, future = request
+            self.buffer[len(self.batch)] = image
+            self.batch.append((submitted, future))
+
+
+    def _run(self) -> None:
+        """
+        Worker thread: collects a batch, runs it and answers its requests.
+        """
+        while True:
+            first = self.requests.get()
+            if first is None:
+                if not self.running:
+                    break
+                continue
+            self._collect_batch(first)
+
+            try:
+                probabilities = self.predict_batch(self.buffer)
+            except Exception as error: # answer the requests instead of killing the worker
+                for _, future in self.batch:
+                    future.set_exception(error)
+                continue
+
+            done = time.perf_counter()
+            for i, (submitted, future) in enumerate(self.batch):
+                self.latencies[self.num_requests % self.latencies.shape[0]] = done - submitted
+                self.num_requests += 1
+                future.set_result(np.array(probabilities[i]))
+            self.num_batches += 1
+
+
+    def stats(self) -> dict:
+        """
+        Output: number of requests and batches, average batch size, p50 / p99 / mean
+                latency in ms and throughput in requests per second
+        """
+        latencies = self.latencies[:min(self.num_requests, self.latencies.shape[0])]
+        elapsed = time.perf_counter() - self.start_time if self.start_time is not None else 0.
+        return {'requests': self.num_requests,
+                'batches': self.num_batches,
+                'mean_batch_size': self.num_requests / self.num_batches if self.num_batches else 0.,
+                'latency_p50_ms': float(np.percentile(latencies, 50)) * 1e3 if latencies.size else None,
+                'latency_p99_ms': float(np.percentile(latencies, 99)) * 1e3 if latencies.size else None,
+                'latency_mean_ms': float(np.mean(latencies)) * 1e3 if latencies.size else None,
+                'throughput_per_s': self.num_requests / elapsed if elapsed else 0.}
+
+
+def load_test(server: MicroBatchServer,
+              images: np.ndarray,
+              num_clients: int = 16,
+              requests_per_client: int = 200) -> dict:
+    """
+    Sends single image requests from many client threads at once and returns the
+    server's stats for the run.
+
+    Inputs:
+        server: started server
+        images: uint8 images to send (reused round robin)
+        num_clients: number of concurrent clients
+        requests_per_client: requests sent by every client, one after the other
+
+    Output: the server's stats
+    """
+    def client(offset: int) -> None:
+        for i in range(requests_per_client):
+            server.predict(images[(offset + i) % images.shape[0]])
+
+    with ThreadPoolExecutor(max_workers=num_clients) as pool:
+        list(pool.map(client, range(0, num_clients * requests_per_client, requests_per_client)))
+    return server.stats()
+
+
+def make_handler(server: MicroBatchServer) -> type[BaseHTTPRequestHandler]:
+    """
+    HTTP handler class for the server: POST /predict with the image as 784 raw uint8
+    bytes or a json list of pixels, GET /stats.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send_json(self, status: int, body: dict) -> None:
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send_json(200, server.stats())
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                if length < 0:
+                    raise ValueError("negative Content-Length")
+                body = self.rfile.read(length)
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    pixels = np.asarray(json.loads(body))
+                    # written so nan and inf fail the range check too
+                    if pixels.dtype.kind not in 'iuf' or not np.all((pixels >= 0) & (pixels <= 255)) \
+                            or not np.all(pixels == np.round(pixels)):
+                        raise ValueError("pixels must be whole numbers between 0 and 255")
+                    image = pixels.astype(np.uint8)
+                else:
+                    image = np.frombuffer(body, dtype=np.uint8)
+            except (json.JSONDecodeError, ValueError, OverflowError, TypeError) as error:
+                self._send_json(400, {'error': f"invalid image: {error}"})
+                return
+            if image.size != 28 * 28:
+                self._send_json(400, {'error': f"expected 784 pixels, got {image.size}"})
+                return
+            digit, probabilities = server.predict(image)
+            self._send_json(200, {'digit': digit, 'probabilities': probabilities.tolist()})
+
+        def log_message(self, format, *args): # keep the console quiet under load
+            pass
+
+    return Handler
+
+
+def smoke_check(server: MicroBatchServer, images: np.ndarray) -> dict:
+    """
+    Checks a started server on a few images: concurrent (batched) requests give the
+    same probabilities as one at a time, and the http front end answers /predict
+    with raw bytes and json, rejects a malformed body with 400 and serves /stats.
+    Raises an AssertionError if a check fails.
+
+    Inputs:
+        server: started server
+        images: a few uint8 images, shape (m, 28, 28)
+
+    Output: the server's stats after the checks
+    """
+    sequential = np.array([server.predict(image)[1] for image in images])
+    assert sequential.shape == (images.shape[0], 10) and np.allclose(sequential.sum(axis=1), 1, atol=0.05)
+    futures = [server.submit(image) for image in images]
+    batched = np.array([future.result() for future in futures])
+    assert np.allclose(batched, sequential, atol=1e-5), "batched and single requests differ"
+
+    http_server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(server))
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{http_server.server_address[1]}"
+
+    def post(body: bytes, content_type: str) -> tuple[int, dict]:
+        request = urllib.request.Request(url + '/predict', data=body, headers={'Content-Type': content_type})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    try:
+        expected = int(np.argmax(sequential[0]))
+        status, body = post(images[0].tobytes(), 'application/octet-stream')
+        assert status == 200 and body['digit'] == expected, (status, body)
+        status, body = post(json.dumps(images[0].tolist()).encode(), 'application/json')
+        assert status == 200 and body['digit'] == expected, (status, body)
+        status, body = post(b'[1, 2,', 'application/json')
+        assert status == 400, (status, body)
+        with urllib.request.urlopen(url + '/stats') as response:
+            assert response.status == 200
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+    return server.stats()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Micro-batching inference server for the digit model')
+    parser.add_argument('model', help='.keras model (saved with save_model) or .tflite model')
+    parser.add_argument('--port', type=int, default=8000, help='port of the http server')
+    parser.add_argument('--max-batch-size', type=int, default=32, help='largest micro-batch')
+    parser.add_argument('--max-latency-ms', type=float, default=2.0,
+                        help='longest time a request waits for its batch to fill')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='run a load test on the MNIST test set instead of serving')
+    parser.add_argument('--smoke', action='store_true',
+                        help='run a quick check on 64 MNIST test images instead of serving')
+    args = parser.parse_args()
+
+    if args.model.endswith('.tflite'):
+        inference_server = MicroBatchServer.from_tflite(args.model, args.max_batch_size, args.max_latency_ms)
+    else:
+        import keras
+        inference_server = MicroBatchServer.from_keras(keras.models.load_model(args.model),
+                                                       args.max_batch_size, args.max_latency_ms)
+
+    with inference_server:
+        if args.benchmark:
+            import mnist_store
+            _, (x_test, _) = mnist_store.load_data()
+            print(json.dumps(load_test(inference_server, x_test), indent=2))
+        elif args.smoke:
+            import mnist_store
+            _, (x_test, _) = mnist_store.load_data()
+            print(json.dumps(smoke_check(inference_server, np.array(x_test[:64])), indent=2))
+        else:
+            http_server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(inference_server))
+            print(f"Serving on http://127.0.0.1:{args.port} (POST /predict, GET /stats)")
+            try:
+                http_server.serve_forever()
+            except KeyboardInterrupt:
+                http_server.server_close()
@@ -0,0 +1,172 @@
+"""
+tf.data input pipeline for the digit CNN.
+
+The images stay uint8 (1 byte per pixel) and the labels stay integer class ids, so
+nothing is converted to float or one-hot in memory. The model's Rescaling layer
+converts a batch to float when it's used and the loss is
+sparse_categorical_crossentropy. The pipeline:
+    shuffle -> batch -> augment (optional, in parallel threads) -> prefetch
+so the next batches are prepared by tf.data's thread pool while the current batch
+is training.
+
+Example:
+    train, val = make_train_val_datasets(x_train, y_train, validation_split=0.25, augment=True)
+    network_model.fit(train, validation_data=val, epochs=10)
+
+Smoke check on the first 512 training images:
+    python input_pipeline.py --num-images 512
+"""
+
+# standard library imports
+import argparse
+import json
+
+# 3rd party imports
+import keras
+import numpy as np
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def _augmentation_layers(max_shift: float, max_rotation: float, seed: int | None) -> keras.Sequential:
+    """
+    Random small shifts and rotations. Nearest neighbor interpolation with a black
+    fill only moves pixels around, so the batch can be cast back to uint8 exactly.
+    """
+    return keras.Sequential([
+        keras.layers.RandomTranslation(max_shift, max_shift, fill_mode='constant',
+                                       interpolation='nearest', seed=seed),
+        keras.layers.RandomRotation(max_rotation, fill_mode='constant', interpolation='nearest', seed=seed),
+    ])
+
+
+def make_dataset(x: np.ndarray,
+                 y: np.ndarray,
+                 batch_size: int = 64,
+                 shuffle: bool = False,
+                 augment: bool = False,
+                 max_shift: float = 0.1,
+                 max_rotation: float = 0.05,
+                 seed: int | None = None) -> tf.data.Dataset:
+    """
+    Creates a batched, prefetched dataset of (image, label) pairs.
+
+    Inputs:
+        x: uint8 images, shape (m, 28, 28) or (m, 28, 28, 1)
+        y: integer labels, shape (m,)
+        batch_size: number of images in each batch
+        shuffle: reshuffle the images every epoch
+        augment: randomly shift and rotate the training images
+        max_shift: largest shift as a fraction of the image size
+        max_rotation: largest rotation as a fraction of a full turn
+        seed: seed for the shuffling and augmentation
+
+    Output: dataset of (uint8 images (batch, 28, 28, 1), int32 labels (batch,))
+    """
+    if x.ndim == 3:
+        x = x[..., np.newaxis] # view, not a copy
+
+    dataset = tf.data.Dataset.from_tensor_slices((x, y))
+    if shuffle:
+        # the whole dataset fits in the buffer (1 byte per pixel), so this is a full shuffle
+        dataset = dataset.shuffle(buffer_size=x.shape[0], seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+
+    if augment:
+        layers = _augmentation_layers(max_shift, max_rotation, seed)
+
+        def augment_batch(images, labels):
+            images = layers(tf.cast(images, tf.float32), training=True)
+            return tf.cast(images, tf.uint8), labels
+
+        dataset = dataset.map(augment_batch, num_parallel_calls=AUTOTUNE)
+
+    dataset = dataset.map(lambda images, labels: (images, tf.cast(labels, tf.int32)),
+                          num_parallel_calls=AUTOTUNE)
+
+    options = tf.data.Options()
+    # batches don't have to come out in order when they're shuffled anyway
+    options.deterministic = not shuffle
+    return dataset.with_options(options).prefetch(AUTOTUNE)
+
+
+def make_train_val_datasets(x: np.ndarray,
+                            y: np.ndarray,
+                            validation_split: float = 0.25,
+                            batch_size: int = 64,
+                            augment: bool = False,
+                            seed: int | None = None) -> tuple[tf.data.Dataset, tf.data.Dataset]:
+    """
+    Splits the training set like keras' validation_split (the last validation_split
+    of the samples are the validation set) and creates both datasets. Only the
+    training dataset is shuffled and augmented.
+
+    Inputs:
+        x: uint8 training images
+        y: integer training labels
+        validation_split: fraction of the samples used for validation
+        batch_size: number of images in each batch
+        augment: randomly shift and rotate the training images
+        seed: seed for the shuffling and augmentation
+
+    Outputs:
+        train: training dataset
+        val: validation dataset
+    """
+    split = int(x.shape[0] * (1 - validation_split))
+    train = make_dataset(x[:split], y[:split], batch_size, shuffle=True, augment=augment, seed=seed)
+    val = make_dataset(x[split:], y[split:], batch_size)
+    return train, val
+
+
+def smoke_check(x: np.ndarray, y: np.ndarray, batch_size: int = 32) -> dict:
+    """
+    Runs the pipeline over a few images and checks what comes out: uint8 images with
+    a channel dimension and int32 labels, every image exactly once per epoch, the
+    original order when not shuffled, and uint8 images of the same shape when
+    augmented. Raises an AssertionError if a check fails.
+
+    Inputs:
+        x: uint8 images, shape (m, 28, 28)
+        y: integer labels, shape (m,)
+        batch_size: number of images in each batch
+
+    Output: dictionary of the number of images and batches in each dataset
+    """
+    batches = list(make_dataset(x, y, batch_size).as_numpy_iterator())
+    images = np.concatenate([images for images, _ in batches])
+    labels = np.concatenate([labels for _, labels in batches])
+    assert images.shape == (x.shape[0], 28, 28, 1) and images.dtype == np.uint8, images.shape
+    assert labels.dtype == np.int32, labels.dtype
+    assert np.array_equal(images[..., 0], x) and np.array_equal(labels, y), "unshuffled order changed"
+
+    train, val = make_train_val_datasets(x, y, validation_split=0.25, batch_size=batch_size,
+                                         augment=True, seed=0)
+    split = int(x.shape[0] * 0.75)
+    train_batches = list(train.as_numpy_iterator())
+    train_labels = np.concatenate([labels for _, labels in train_batches])
+    assert np.array_equal(np.sort(train_labels), np.sort(y[:split])), "training images lost or repeated"
+    assert all(images.dtype == np.uint8 and images.shape[1:] == (28, 28, 1) for images, _ in train_batches)
+    val_labels = np.concatenate([labels for _, labels in val.as_numpy_iterator()])
+    assert np.array_equal(val_labels, y[split:]), "validation set isn't the last samples"
+
+    return {'images': int(x.shape[0]),
+            'batches': len(batches),
+            'train_images': int(train_labels.shape[0]),
+            'train_batches': len(train_batches),
+            'val_images': int(val_labels.shape[0])}
+
+
+if __name__ == "__main__":
+
+    import mnist_store
+
+    parser = argparse.ArgumentParser(description='Smoke check of the tf.data pipeline on a few MNIST images')
+    parser.add_argument('--data', default=mnist_store.DEFAULT_SOURCE, help='mnist.npz file or folder of IDX files')
+    parser.add_argument('--num-images', type=int, default=512, help='number of training images to run')
+    args = parser.parse_args()
+
+    (x_train, y_train), _ = mnist_store.load_data(args.data)
+    print(json.dumps(smoke_check(np.array(x_train[:args.num_images]), np.array(y_train[:args.num_images])),
+                     indent=2))
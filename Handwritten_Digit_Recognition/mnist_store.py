@@ -0,0 +1,309 @@
+"""
+Offline, memory-mapped MNIST loader.
+
+mnist.load_data() downloads the dataset on first use and unpacks the whole archive
+into new arrays on every start. This loader ingests local files once into a folder
+of .npy files:
+- x_train.npy, y_train.npy, x_test.npy, y_test.npy: uint8 arrays
+- meta.json: shapes, the sha256 of every array and the size / modified time /
+  sha256 of the source files
+
+Later starts open the .npy files with np.load(mmap_mode='r'), so nothing is parsed,
+decompressed or copied, and no network access is needed.
+
+The source can be:
+- the mnist.npz file keras downloads (~/.keras/datasets/mnist.npz by default)
+- a folder with the original IDX files (train-images-idx3-ubyte, train-labels-idx1-ubyte,
+  t10k-images-idx3-ubyte, t10k-labels-idx1-ubyte, optionally gzipped)
+
+Integrity checks: IDX headers and sizes are validated, images and labels must have
+the same count and the labels must be digits. The source can be checked against a
+known sha256, and open_mnist_store(verify=True) rehashes the stored arrays.
+
+Example:
+    (x_train, y_train), (x_test, y_test) = load_data()                 # keras' mnist.npz
+    (x_train, y_train), (x_test, y_test) = load_data('/data/mnist_idx')  # IDX folder
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+STORE_VERSION = 1
+
+DEFAULT_SOURCE = os.path.join(os.path.expanduser('~'), '.keras', 'datasets', 'mnist.npz')
+
+ARRAY_NAMES = ('x_train', 'y_train', 'x_test', 'y_test')
+
+IDX_FILES = {'x_train': 'train-images-idx3-ubyte',
+             'y_train': 'train-labels-idx1-ubyte',
+             'x_test': 't10k-images-idx3-ubyte',
+             'y_test': 't10k-labels-idx1-ubyte'}
+
+# IDX data type codes (third byte of the magic number)
+IDX_DTYPES = {0x08: np.uint8, 0x09: np.int8, 0x0B: np.dtype('>i2'),
+              0x0C: np.dtype('>i4'), 0x0D: np.dtype('>f4'), 0x0E: np.dtype('>f8')}
+
+
+def file_sha256(path: str) -> str:
+    """
+    Output: sha256 hex digest of a file, read in 1 MB blocks
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def file_fingerprint(path: str, with_hash: bool = True) -> dict:
+    """
+    Returns the size, modified time and (optionally) sha256 of a file.
+
+    Inputs:
+        path: path to the file
+        with_hash: also hash the file contents
+
+    Output: dictionary with 'size', 'mtime_ns' and 'sha256'
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(path) if with_hash else None}
+
+
+def array_sha256(array: np.ndarray) -> str:
+    """
+    Output: sha256 hex digest of an array's shape, dtype and values
+    """
+    sha = hashlib.sha256()
+    sha.update(str((array.shape, array.dtype.str)).encode())
+    sha.update(np.ascontiguousarray(array).data)
+    return sha.hexdigest()
+
+
+def parse_idx(path: str) -> np.ndarray:
+    """
+    Parses an IDX file (optionally gzipped). The header is a magic number
+    (0, 0, data type, number of dimensions) followed by one big endian int32 per
+    dimension.
+
+    Input:
+        path: path to the file
+
+    Output: the array in the file
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        content = f.read()
+
+    if len(content) < 4 or content[0] != 0 or content[1] != 0 or content[2] not in IDX_DTYPES:
+        raise ValueError(f"{path} is not an IDX file (bad magic number)")
+    dtype = np.dtype(IDX_DTYPES[content[2]])
+    ndim = content[3]
+    header_size = 4 + 4 * ndim
+    if len(content) < header_size:
+        raise ValueError(f"{path} is truncated (incomplete header)")
+
+    shape = tuple(int(size) for size in np.frombuffer(content, dtype='>u4', count=ndim, offset=4))
+    expected = header_size + int(np.prod(shape)) * dtype.itemsize
+    if len(content) != expected:
+        raise ValueError(f"{path} has {len(content)} bytes, expected {expected} for shape {shape}")
+
+    return np.frombuffer(content, dtype=dtype, offset=header_size).reshape(shape).astype(dtype.newbyteorder('='))
+
+
+def _source_files(source: str) -> list[str]:
+    """
+    Files that make up a source (the npz file or the 4 IDX files of a folder).
+    """
+    if not os.path.isdir(source):
+        return [source]
+    files = []
+    for name in IDX_FILES.values():
+        path = os.path.join(source, name)
+        files.append(path if os.path.exists(path) else path + '.gz')
+    return files
+
+
+def read_source(source: str) -> dict[str, np.ndarray]:
+    """
+    Reads the 4 arrays of an npz file or an IDX folder and checks them.
+
+    Input:
+        source: path to mnist.npz or to a folder of IDX files
+
+    Output: dictionary of x_train, y_train, x_test and y_test
+    """
+    if os.path.isdir(source):
+        arrays = {name: parse_idx(path) for name, path in zip(IDX_FILES, _source_files(source))}
+    else:
+        with np.load(source, allow_pickle=False) as data:
+            missing = [name for name in ARRAY_NAMES if name not in data.files]
+            if missing:
+                raise ValueError(f"{source} is missing the arrays {missing}")
+            arrays = {name: data[name] for name in ARRAY_NAMES}
+
+    for split in ('train', 'test'):
+        x, y = arrays[f"x_{split}"], arrays[f"y_{split}"]
+        if x.ndim != 3 or y.ndim != 1 or x.shape[0] != y.shape[0]:
+            raise ValueError(f"{source}: {split} images {x.shape} don't match labels {y.shape}")
+        if y.size and (y.min() < 0 or y.max() > 9):
+            raise ValueError(f"{source}: {split} labels must be digits 0-9")
+        arrays[f"x_{split}"] = x.astype(np.uint8, copy=False)
+        arrays[f"y_{split}"] = y.astype(np.uint8, copy=False)
+    return arrays
+
+
+class MnistStore:
+    """
+    Read-only view of a store folder. The arrays are memory-mapped.
+    """
+
+    def __init__(self, store_dir: str):
+        """
+        Opens the arrays of an existing store without reading them into memory.
+
+        Input:
+            store_dir: folder created by build_mnist_store
+        """
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json'), encoding='utf-8') as f:
+            self.meta: dict = json.load(f)
+
+        self.arrays: dict[str, np.memmap] = {}
+        for name in ARRAY_NAMES:
+            array = np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode='r')
+            if list(array.shape) != self.meta['shapes'][name] or array.dtype != np.uint8:
+                raise ValueError(f"{store_dir}/{name}.npy has shape {array.shape} and dtype {array.dtype}, "
+                                 f"expected {tuple(self.meta['shapes'][name])} uint8")
+            self.arrays[name] = array
+
+
+    def verify(self) -> None:
+        """
+        Rehashes every array and raises a ValueError if one doesn't match the hash
+        recorded when the store was built (ex. a corrupted or partly copied file).
+        """
+        for name, array in self.arrays.items():
+            if array_sha256(array) != self.meta['sha256'][name]:
+                raise ValueError(f"{self.store_dir}/{name}.npy doesn't match its recorded sha256")
+
+
+    def load_data(self) -> tuple[tuple[np.memmap, np.memmap], tuple[np.memmap, np.memmap]]:
+        """
+        Output: (x_train, y_train), (x_test, y_test) like mnist.load_data()
+        """
+        return ((self.arrays['x_train'], self.arrays['y_train']),
+                (self.arrays['x_test'], self.arrays['y_test']))
+
+
+def build_mnist_store(source: str, store_dir: str, expected_sha256: str | None = None) -> MnistStore:
+    """
+    Converts an npz file or IDX folder into a store.
+
+    Inputs:
+        source: path to mnist.npz or to a folder of IDX files
+        store_dir: folder to write the store to (replaced if it exists)
+        expected_sha256: sha256 the source file must have (only for an npz source)
+
+    Output: the opened MnistStore
+    """
+    sources = {path: file_fingerprint(path) for path in _source_files(source)}
+    if expected_sha256 is not None and not os.path.isdir(source):
+        if sources[source]['sha256'] != expected_sha256:
+            raise ValueError(f"{source} has sha256 {sources[source]['sha256']}, expected {expected_sha256}")
+
+    arrays = read_source(source)
+
+    # write into a temporary folder so a failed build never leaves a broken store
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    meta = {'version': STORE_VERSION,
+            'sources': sources,
+            'shapes': {name: list(array.shape) for name, array in arrays.items()},
+            'sha256': {name: array_sha256(array) for name, array in arrays.items()}}
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return MnistStore(store_dir)
+
+
+def _sources_unchanged(meta: dict) -> bool:
+    """
+    Checks the recorded source files (size and modified time first, sha256 only if
+    those differ). Missing source files count as unchanged, so a store copied to a
+    machine without the source files can still be opened.
+    """
+    for path, recorded in meta['sources'].items():
+        if not os.path.exists(path):
+            continue
+        current = file_fingerprint(path, with_hash=False)
+        if current['size'] == recorded['size'] and current['mtime_ns'] == recorded['mtime_ns']:
+            continue
+        if file_sha256(path) != recorded['sha256']:
+            return False
+    return True
+
+
+def open_mnist_store(source: str = DEFAULT_SOURCE,
+                     store_dir: str | None = None,
+                     verify: bool = False,
+                     expected_sha256: str | None = None) -> MnistStore:
+    """
+    Opens the store of source, building it first if it doesn't exist, was built by a
+    different version, or the source files changed since it was built.
+
+    Inputs:
+        source: path to mnist.npz or to a folder of IDX files
+        store_dir: folder of the store (defaults to '<source>_store' next to the source)
+        verify: rehash the stored arrays when opening (slower, catches corrupted files)
+        expected_sha256: sha256 the source file must have (checked when building)
+
+    Output: the opened MnistStore
+    """
+    source = os.path.abspath(source).rstrip(os.sep)
+    if store_dir is None:
+        store_dir = os.path.splitext(source)[0] + '_store'
+    meta_path = os.path.join(store_dir, 'meta.json')
+
+    store = None
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') == STORE_VERSION and _sources_unchanged(meta):
+            store = MnistStore(store_dir)
+
+    if store is None:
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"no MNIST store at {store_dir} and no source files at {source}")
+        store = build_mnist_store(source, store_dir, expected_sha256)
+    elif verify:
+        store.verify()
+    return store
+
+
+def load_data(source: str = DEFAULT_SOURCE,
+              store_dir: str | None = None,
+              verify: bool = False) -> tuple[tuple[np.memmap, np.memmap], tuple[np.memmap, np.memmap]]:
+    """
+    Drop in replacement for mnist.load_data() that works offline and returns
+    read-only memory-mapped uint8 arrays.
+
+    Inputs:
+        source: path to mnist.npz or to a folder of IDX files
+        store_dir: folder of the store (defaults to '<source>_store' next to the source)
+        verify: rehash the stored arrays when opening
+
+    Output: (x_train, y_train), (x_test, y_test)
+    """
+    return open_mnist_store(source, store_dir, verify).load_data()
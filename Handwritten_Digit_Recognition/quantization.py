@@ -0,0 +1,308 @@
+"""
+Post-training int8 quantization of the digit CNN for CPU inference.
+
+The trained keras network is exported as a SavedModel and converted twice with the
+TFLite converter:
+- float32: the same network in the TFLite format (the baseline)
+- int8: weights and activations quantized to 8 bit integers. The activation ranges
+  come from a representative calibration set of training images. The input is the
+  raw uint8 pixels (the Rescaling layer is folded into the input quantization) and
+  the output is float32 probabilities.
+
+Both models run with the TFLite interpreter (tflite_runtime if it's installed, which
+is a small package without the rest of tensorflow, otherwise tf.lite). The report
+compares their accuracy on the test set, single image latency and batch throughput.
+
+Example:
+    report = quantization_report(model.network_model, model.x_train, model.x_test, model.y_test, 'export')
+
+Smoke check (trains a tiny network on 512 images and round trips 64 test images
+through both TFLite models):
+    python quantization.py --num-images 512
+"""
+
+# standard library imports
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# 3rd party imports
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+
+def representative_dataset(x: np.ndarray, num_samples: int = 500, seed: int | None = 0):
+    """
+    Calibration images for the int8 converter: a random sample of the training
+    images, one at a time, as float32 (what the network's input expects).
+
+    Inputs:
+        x: uint8 training images, shape (m, 28, 28)
+        num_samples: number of calibration images
+        seed: seed for picking the images
+
+    Output: function that yields [image] lists (the format the converter wants)
+    """
+    idx = np.random.default_rng(seed).choice(x.shape[0], size=min(num_samples, x.shape[0]), replace=False)
+
+    def generator():
+        for i in idx:
+            yield [x[i].reshape(1, 28, 28, 1).astype(np.float32)]
+
+    return generator
+
+
+def export_tflite(network_model, path: str, x_calibration: np.ndarray | None = None,
+                  num_calibration: int = 500) -> str:
+    """
+    Converts the keras network to a TFLite model file.
+
+    Inputs:
+        network_model: trained keras model
+        path: file the .tflite model is written to
+        x_calibration: uint8 training images for int8 calibration (None for a float32 model)
+        num_calibration: number of calibration images
+
+    Output: path of the model file
+    """
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        network_model.export(saved_model_dir)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+
+        if x_calibration is not None:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = representative_dataset(x_calibration, num_calibration)
+            # only int8 kernels, so the conversion fails instead of silently keeping float ops
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.uint8
+
+        tflite_model = converter.convert()
+
+    with open(path, 'wb') as f:
+        f.write(tflite_model)
+    return path
+
+
+class TFLiteClassifier:
+    """
+    Runs a .tflite digit model with a fixed batch size. The input tensor is resized
+    and allocated once, and images are quantized to the input type if the model
+    expects integers.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1, num_threads: int | None = None):
+        """
+        Inputs:
+            path: .tflite model file
+            batch_size: number of images run per call
+            num_threads: interpreter threads (None lets the runtime decide)
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.interpreter.resize_tensor_input(self.input['index'], [batch_size, 28, 28, 1])
+        self.interpreter.allocate_tensors()
+        self.input_dtype = self.input['dtype']
+        self.input_scale, self.input_zero_point = self.input['quantization']
+
+
+    def _prepare(self, images: np.ndarray) -> np.ndarray:
+        """
+        Converts uint8 pixels to the model's input type (quantizing them if needed).
+        """
+        images = images.reshape(-1, 28, 28, 1)
+        if self.input_dtype == np.float32:
+            return images.astype(np.float32)
+        if images.dtype == self.input_dtype and self.input_scale == 1.0 and self.input_zero_point == 0:
+            return images
+        info = np.iinfo(self.input_dtype)
+        quantized = np.round(images / self.input_scale + self.input_zero_point)
+        return np.clip(quantized, info.min, info.max).astype(self.input_dtype)
+
+
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        """
+        Runs exactly one batch.
+
+        Input:
+            images: uint8 images, shape (batch_size, 28, 28) or (batch_size, 28, 28, 1)
+
+        Output: probabilities, shape (batch_size, 10)
+        """
+        self.interpreter.set_tensor(self.input['index'], self._prepare(images))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output['index'])
+        scale, zero_point = self.output['quantization']
+        if output.dtype != np.float32:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        """
+        Runs any number of images, batch_size at a time (the last batch is padded).
+
+        Input:
+            images: uint8 images, shape (m, 28, 28) or (m, 28, 28, 1)
+
+        Output: probabilities, shape (m, 10)
+        """
+        m = images.shape[0]
+        probabilities = np.empty((m, 10), dtype=np.float32)
+        batch = np.zeros((self.batch_size, 28, 28, 1), dtype=images.dtype)
+        for start in range(0, m, self.batch_size):
+            stop = min(start + self.batch_size, m)
+            batch[:stop - start] = images[start:stop].reshape(-1, 28, 28, 1)
+            probabilities[start:stop] = self.predict_batch(batch)[:stop - start]
+        return probabilities
+
+
+def benchmark_classifier(path: str,
+                         x: np.ndarray,
+                         y: np.ndarray,
+                         batch_size: int = 256,
+                         num_latency_runs: int = 500) -> dict:
+    """
+    Measures a .tflite model's accuracy, single image latency and batch throughput.
+
+    Inputs:
+        path: .tflite model file
+        x: uint8 test images
+        y: test labels
+        batch_size: batch size for the accuracy and throughput runs
+        num_latency_runs: number of single image calls timed
+
+    Output: dictionary of the model size, accuracy, p50 / p99 latency and throughput
+    """
+    batched = TFLiteClassifier(path, batch_size=batch_size)
+    batched.predict(x[:batch_size]) # warm up
+
+    start = time.perf_counter()
+    probabilities = batched.predict(x)
+    seconds = time.perf_counter() - start
+
+    single = TFLiteClassifier(path, batch_size=1)
+    single.predict_batch(x[:1]) # warm up
+    latencies = np.empty(num_latency_runs)
+    for i in range(num_latency_runs):
+        image = x[i % x.shape[0]][np.newaxis]
+        start = time.perf_counter()
+        single.predict_batch(image)
+        latencies[i] = time.perf_counter() - start
+
+    return {'Size (KB)': os.path.getsize(path) / 1024,
+            'Test Accuracy': float(np.mean(np.argmax(probabilities, axis=1) == y)) * 100,
+            'Latency p50 (ms)': float(np.percentile(latencies, 50)) * 1e3,
+            'Latency p99 (ms)': float(np.percentile(latencies, 99)) * 1e3,
+            'Throughput (images/s)': x.shape[0] / seconds}
+
+
+def quantization_report(network_model,
+                        x_train: np.ndarray,
+                        x_test: np.ndarray,
+                        y_test: np.ndarray,
+                        output_dir: str,
+                        num_calibration: int = 500) -> pd.DataFrame:
+    """
+    Exports the float32 and int8 TFLite models to output_dir and compares them.
+    The report is also written to output_dir/Quantization_Report.txt.
+
+    Inputs:
+        network_model: trained keras model
+        x_train: uint8 training images (calibration set)
+        x_test: uint8 test images
+        y_test: test labels
+        output_dir: folder for the model files and the report
+        num_calibration: number of calibration images
+
+    Output: dataframe with one row per model and the int8 accuracy difference
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    float_path = export_tflite(network_model, os.path.join(output_dir, 'digit_cnn_float32.tflite'))
+    int8_path = export_tflite(network_model, os.path.join(output_dir, 'digit_cnn_int8.tflite'),
+                              x_train, num_calibration)
+
+    report = pd.DataFrame([{'Model': 'float32', **benchmark_classifier(float_path, x_test, y_test)},
+                           {'Model': 'int8', **benchmark_classifier(int8_path, x_test, y_test)}])
+    report['Accuracy Difference'] = report['Test Accuracy'] - report['Test Accuracy'].iloc[0]
+
+    report.to_csv(os.path.join(output_dir, 'Quantization_Report.txt'), sep='\t', index=False, float_format='%.3f')
+    return report
+
+
+def smoke_check(x_train: np.ndarray,
+                y_train: np.ndarray,
+                x_test: np.ndarray,
+                output_dir: str,
+                epochs: int = 1) -> dict:
+    """
+    Trains a tiny network for an epoch, exports it as float32 and int8 TFLite models
+    and runs the test images through both. Checks that the float32 model matches
+    keras, that the int8 model takes uint8 pixels and that both output probabilities.
+    Raises an AssertionError if a check fails.
+
+    Inputs:
+        x_train: a few uint8 training images (also the calibration set)
+        y_train: their labels
+        x_test: a few uint8 test images
+        output_dir: folder for the model files
+        epochs: number of training epochs
+
+    Output: dictionary of the largest float32 difference to keras and how often the
+            int8 model predicts the same digit as the float32 model
+    """
+    import keras
+    from distillation import build_student
+    from input_pipeline import make_dataset
+
+    network_model = keras.Sequential([build_student(filters=(8,)), keras.layers.Softmax()])
+    network_model.compile(optimizer='adam', loss='sparse_categorical_crossentropy')
+    network_model.fit(make_dataset(x_train, y_train, shuffle=True, seed=0), epochs=epochs, verbose=0)
+    keras_probabilities = network_model.predict(x_test[..., np.newaxis], verbose=0)
+
+    os.makedirs(output_dir, exist_ok=True)
+    float_path = export_tflite(network_model, os.path.join(output_dir, 'smoke_float32.tflite'))
+    int8_path = export_tflite(network_model, os.path.join(output_dir, 'smoke_int8.tflite'),
+                              x_train, num_calibration=min(100, x_train.shape[0]))
+
+    float_probabilities = TFLiteClassifier(float_path, batch_size=16).predict(x_test)
+    int8_classifier = TFLiteClassifier(int8_path, batch_size=16)
+    int8_probabilities = int8_classifier.predict(x_test)
+
+    assert int8_classifier.input_dtype == np.uint8, int8_classifier.input_dtype
+    for probabilities in (float_probabilities, int8_probabilities):
+        assert probabilities.shape == (x_test.shape[0], 10), probabilities.shape
+        assert np.all(np.isfinite(probabilities)) and np.allclose(probabilities.sum(axis=1), 1, atol=0.05)
+    max_difference = float(np.max(np.abs(float_probabilities - keras_probabilities)))
+    assert max_difference < 1e-4, f"float32 TFLite model differs from keras by {max_difference}"
+
+    return {'images': int(x_test.shape[0]),
+            'float32_max_difference': max_difference,
+            'int8_agreement': float(np.mean(np.argmax(int8_probabilities, axis=1)
+                                            == np.argmax(float_probabilities, axis=1)))}
+
+
+if __name__ == "__main__":
+
+    import mnist_store
+
+    parser = argparse.ArgumentParser(description='Smoke check of the TFLite export on a few MNIST images')
+    parser.add_argument('--data', default=mnist_store.DEFAULT_SOURCE, help='mnist.npz file or folder of IDX files')
+    parser.add_argument('--num-images', type=int, default=512, help='number of training images')
+    parser.add_argument('--num-test-images', type=int, default=64, help='number of test images round tripped')
+    args = parser.parse_args()
+
+    (x_train, y_train), (x_test, _) = mnist_store.load_data(args.data)
+    with tempfile.TemporaryDirectory() as model_dir:
+        print(json.dumps(smoke_check(np.array(x_train[:args.num_images]), np.array(y_train[:args.num_images]),
+                                     np.array(x_test[:args.num_test_images]), model_dir), indent=2))
@@ -0,0 +1,277 @@
+"""
+Benchmarks for the hot paths in tools.py.
+
+compare: runs the vectorized compute_cost and compute_gradient functions against
+the original loop implementations. For every dataset size both versions are run on
+the same random data, their outputs are checked to be equal (within floating point
+tolerance), and the best time per call is printed along with the speedup.
+
+suite: times compute_cost, compute_gradient, gradient_descent and zscore_normalization
+over a grid of (m, n) synthetic datasets plus housing.csv and writes the results to a
+json file. If a baseline json exists, the suite fails (exit code 1) when any kernel
+is slower than threshold times its baseline time.
+
+Run from the Linear_Regression folder:
+    python benchmark_tools.py compare
+    python benchmark_tools.py suite --save-baseline   # record the baseline once
+    python benchmark_tools.py suite                   # compare against it
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+import numpy.typing as npt
+from tools import compute_cost, compute_gradient, gradient_descent, zscore_normalization
+
+SUITE_SIZES = [(1000, 8), (10000, 8), (10000, 64), (100000, 16)]
+
+
+def loop_compute_cost(x: npt.NDArray,
+                      y: npt.NDArray,
+                      w: npt.NDArray,
+                      b: float,
+                      lambda_: float) -> float:
+    """
+    Original loop version of compute_cost, kept as the reference implementation.
+    """
+    m = x.shape[0]
+    n = len(w)
+    cost = 0.
+
+    for i in range(m):
+        f_wb_i = np.dot(x[i], w) + b
+        cost = cost + (f_wb_i - y[i])**2
+    cost = cost / (2 * m)
+
+    reg_cost = 0.
+    for i in range(n):
+        reg_cost += (w[i]**2)
+    reg_cost = (lambda_ / (2 * m)) * reg_cost
+
+    return cost + reg_cost
+
+
+def loop_compute_gradient(x: npt.NDArray,
+                          y: npt.NDArray,
+                          w: npt.NDArray,
+                          b: float,
+                          lambda_: float) -> tuple[npt.NDArray, float]:
+    """
+    Original loop version of compute_gradient, kept as the reference implementation.
+    """
+    m, n = x.shape
+    dj_dw = np.zeros((n,))
+    dj_db = 0.
+
+    for i in range(m):
+        cost = (np.dot(x[i], w) + b) - y[i]
+        for j in range(n):
+            dj_dw[j] = dj_dw[j] + cost * x[i, j]
+        dj_db += cost
+
+    dj_dw = dj_dw / m
+    dj_db = dj_db / m
+
+    for i in range(n):
+        dj_dw[i] = dj_dw[i] + (lambda_ / m) * w[i]
+
+    return dj_dw, dj_db
+
+
+def time_function(func, *args, repeats: int = 3) -> float:
+    """
+    Returns the best time (in seconds) of calling func(*args).
+
+    Inputs:
+        func: function to time
+        args: arguments passed to func
+        repeats: how many times the function is called
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes: list[tuple[int, int]], lambda_: float = 0.7) -> None:
+    """
+    Compares the loop and vectorized functions for every (m, n) dataset size.
+
+    Inputs:
+        sizes: list of (number of samples, number of features)
+        lambda_: controls amount of regularization applied
+    """
+    rng = np.random.default_rng(1)
+
+    print(f"{'m':>8} {'n':>4} | {'function':<16} | {'loop (ms)':>10} {'vector (ms)':>12} {'speedup':>9}")
+    print("-" * 70)
+
+    for m, n in sizes:
+        x = rng.standard_normal((m, n))
+        y = rng.standard_normal(m)
+        w = rng.standard_normal(n)
+        b = 0.5
+
+        # make sure both versions agree before timing them
+        np.testing.assert_allclose(compute_cost(x, y, w, b, lambda_),
+                                   loop_compute_cost(x, y, w, b, lambda_), rtol=1e-9)
+        dj_dw, dj_db = compute_gradient(x, y, w, b, lambda_)
+        dj_dw_loop, dj_db_loop = loop_compute_gradient(x, y, w, b, lambda_)
+        np.testing.assert_allclose(dj_dw, dj_dw_loop, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(dj_db, dj_db_loop, rtol=1e-9, atol=1e-12)
+
+        for name, loop_func, vector_func in [('compute_cost', loop_compute_cost, compute_cost),
+                                             ('compute_gradient', loop_compute_gradient, compute_gradient)]:
+            loop_time = time_function(loop_func, x, y, w, b, lambda_)
+            vector_time = time_function(vector_func, x, y, w, b, lambda_, repeats=20)
+            print(f"{m:>8} {n:>4} | {name:<16} | {loop_time * 1e3:>10.3f} {vector_time * 1e3:>12.4f} "
+                  f"{loop_time / vector_time:>8.0f}x")
+
+
+def median_time(func, *args, repeats: int = 7) -> float:
+    """
+    Returns the median time (in seconds) of calling func(*args) after one warm up call.
+    The median is less noisy than the best time for comparing against a baseline.
+
+    Inputs:
+        func: function to time
+        args: arguments passed to func
+        repeats: how many times the function is timed
+    """
+    func(*args)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def suite_datasets() -> list[tuple[str, npt.NDArray, npt.NDArray]]:
+    """
+    Returns the (name, x, y) datasets used by the suite: normalized synthetic data for
+    every size in SUITE_SIZES plus housing.csv (if it's in the current folder).
+    """
+    rng = np.random.default_rng(1)
+    datasets = []
+    for m, n in SUITE_SIZES:
+        x = rng.standard_normal((m, n))
+        y = x @ rng.standard_normal(n) + rng.standard_normal(m)
+        datasets.append((f"synthetic_{m}x{n}", x, y))
+
+    if os.path.exists('housing.csv'):
+        from feature_store import open_feature_store
+        store = open_feature_store('housing.csv', target='median_house_value')
+        x = store.x_scaler.transform(store.x)
+        y = store.y_scaler.transform(store.y)
+        datasets.append(('housing', x, y))
+    return datasets
+
+
+def run_suite(lambda_: float = 1.0, alpha: float = 0.1, num_iters: int = 100) -> dict:
+    """
+    Times every kernel on every suite dataset.
+
+    Inputs:
+        lambda_: controls amount of regularization applied
+        alpha: learning rate for gradient_descent
+        num_iters: gradient_descent iterations (cost only computed at the end)
+
+    Output: dictionary with the machine info and a {kernel/dataset: seconds} mapping
+    """
+    results = {}
+    for name, x, y in suite_datasets():
+        n = x.shape[1]
+        w = np.zeros(n)
+        results[f"compute_cost/{name}"] = median_time(compute_cost, x, y, w, 0., lambda_)
+        results[f"compute_gradient/{name}"] = median_time(compute_gradient, x, y, w, 0., lambda_)
+        results[f"gradient_descent/{name}"] = median_time(gradient_descent, x, y, w, 0., lambda_,
+                                                          alpha, num_iters, 'end', repeats=3)
+        results[f"zscore_normalization/{name}"] = median_time(zscore_normalization, x)
+        print(f"{name:<24} done")
+
+    return {'machine': {'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+            'results': results}
+
+
+def check_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compares the suite results against a baseline.
+
+    Inputs:
+        results: {kernel/dataset: seconds} from run_suite
+        baseline: {kernel/dataset: seconds} from an earlier run
+        threshold: a kernel regressed if it's more than threshold times slower
+
+    Output: list of messages for every kernel that regressed
+    """
+    regressions = []
+    print(f"{'benchmark':<44} {'baseline (ms)':>14} {'now (ms)':>10} {'ratio':>7}")
+    print("-" * 78)
+    for key, seconds in results.items():
+        if key not in baseline:
+            print(f"{key:<44} {'-':>14} {seconds * 1e3:>10.3f} {'new':>7}")
+            continue
+        ratio = seconds / baseline[key]
+        flag = '  <-- REGRESSION' if ratio > threshold else ''
+        print(f"{key:<44} {baseline[key] * 1e3:>14.3f} {seconds * 1e3:>10.3f} {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(f"{key}: {ratio:.2f}x slower than the baseline (threshold {threshold}x)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command line entry point, returns the exit code.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('compare', help='loop vs vectorized compute_cost and compute_gradient')
+    suite = subparsers.add_parser('suite', help='timing suite with regression thresholds')
+    suite.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    suite.add_argument('--baseline', default='benchmark_baseline.json', help='baseline results to compare to')
+    suite.add_argument('--threshold', type=float, default=1.5,
+                       help='fail if a kernel is more than this many times slower than the baseline')
+    suite.add_argument('--save-baseline', action='store_true', help='save these results as the new baseline')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        # last size is roughly the shape of housing.csv after dropping rows/columns
+        run_benchmark([(100, 8), (1000, 8), (5000, 32), (20433, 8)])
+        return 0
+
+    report = run_suite()
+    report['threshold'] = args.threshold
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = check_regressions(report['results'], baseline, args.threshold)
+    for message in regressions:
+        print(message)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
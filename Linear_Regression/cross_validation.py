@@ -0,0 +1,150 @@
+"""
+Parallel k-fold cross validation for the gradient_descent model in tools.py.
+
+The folds are trained at the same time in a process pool. x and y are copied once
+into shared memory and every worker maps them directly, so the dataset isn't
+pickled and sent to each worker. Only the validation indices of a fold are sent.
+
+Example:
+    store = open_feature_store('housing.csv', target='median_house_value')
+    folds, summary = cross_validate(store.x, store.y, k=10, lambda_=1.0, alpha=0.1, num_iters=100)
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from tools import ZScoreScaler, compute_residual, gradient_descent
+
+# shared arrays attached once per worker process by _attach_shared_arrays
+_shared: dict = {}
+
+
+def _attach_shared_arrays(x_spec: tuple, y_spec: tuple) -> None:
+    """
+    Pool initializer: maps the shared memory blocks of x and y into numpy arrays.
+    """
+    for key, (name, shape, dtype) in (('x', x_spec), ('y', y_spec)):
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key + '_block'] = block # keep the block open while the worker lives
+        _shared[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _train_fold(fold: int,
+                val_idx: npt.NDArray,
+                lambda_: float,
+                alpha: float,
+                num_iters: int,
+                normalize: bool) -> dict:
+    """
+    Trains on every sample except val_idx and scores the model on val_idx.
+    """
+    start = time.perf_counter()
+    x, y = _shared['x'], _shared['y']
+
+    train_mask = np.ones(x.shape[0], dtype=bool)
+    train_mask[val_idx] = False
+    x_train, y_train = x[train_mask], y[train_mask]
+    x_val, y_val = x[val_idx], y[val_idx]
+
+    # normalization statistics only come from the training folds
+    if normalize:
+        scaler = ZScoreScaler().fit(x_train)
+        x_train = scaler.transform(x_train, copy=False)
+        x_val = scaler.transform(x_val, copy=False)
+
+    w, b, _ = gradient_descent(x_train, y_train, np.zeros(x.shape[1]), 0., lambda_,
+                               alpha, num_iters, cost_every=None)
+
+    err = compute_residual(x_val, y_val, w, b)
+    mse = float(np.dot(err, err) / err.shape[0])
+    return {'fold': fold,
+            'mse': mse,
+            'rmse': float(np.sqrt(mse)),
+            'train_size': int(y_train.shape[0]),
+            'val_size': int(y_val.shape[0]),
+            'seconds': time.perf_counter() - start}
+
+
+def _share_array(array: npt.NDArray) -> tuple[shared_memory.SharedMemory, tuple]:
+    """
+    Copies an array into a new shared memory block.
+    """
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def cross_validate(x: npt.NDArray,
+                   y: npt.NDArray,
+                   k: int,
+                   lambda_: float,
+                   alpha: float,
+                   num_iters: int,
+                   normalize: bool = True,
+                   n_jobs: int | None = None,
+                   seed: int | None = 0) -> tuple[pd.DataFrame, dict]:
+    """
+    Runs k-fold cross validation of gradient_descent with the folds trained in parallel.
+
+    Inputs:
+        x: training data (not normalized if normalize is True)
+        y: target values
+        k: number of folds
+        lambda_: controls amount of regularization applied
+        alpha: learning rate
+        num_iters: how many iterations to run gradient descent
+        normalize: zscore normalize x inside every fold with the training fold's statistics
+        n_jobs: number of worker processes (defaults to min(k, cpu count))
+        seed: seed for shuffling the samples into folds (None keeps the original order)
+
+    Outputs:
+        folds: dataframe with the mse, rmse, sizes and training time of every fold
+        summary: mean and standard deviation of the mse and rmse over the folds,
+                 plus the total wall clock time
+    """
+    m = x.shape[0]
+    if not 2 <= k <= m:
+        raise ValueError(f"k must be between 2 and the number of samples ({m}), not {k}")
+
+    order = np.random.default_rng(seed).permutation(m) if seed is not None else np.arange(m)
+    val_folds = np.array_split(order, k)
+    n_jobs = n_jobs or min(k, os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    x_block, x_spec = _share_array(np.asarray(x, dtype=np.float64))
+    y_block, y_spec = _share_array(np.asarray(y, dtype=np.float64))
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs,
+                                 initializer=_attach_shared_arrays,
+                                 initargs=(x_spec, y_spec)) as pool:
+            futures = [pool.submit(_train_fold, fold, val_idx, lambda_, alpha, num_iters, normalize)
+                       for fold, val_idx in enumerate(val_folds)]
+            results = [future.result() for future in futures]
+    finally:
+        for block in (x_block, y_block):
+            block.close()
+            block.unlink()
+
+    folds = pd.DataFrame(results)
+    summary = {'mean_mse': float(folds['mse'].mean()),
+               'std_mse': float(folds['mse'].std(ddof=0)),
+               'mean_rmse': float(folds['rmse'].mean()),
+               'std_rmse': float(folds['rmse'].std(ddof=0)),
+               'seconds': time.perf_counter() - start}
+    return folds, summary
+
+
+if __name__ == "__main__":
+
+    from feature_store import open_feature_store
+
+    housing = open_feature_store('housing.csv', target='median_house_value')
+    fold_scores, scores = cross_validate(housing.x, housing.y, k=10,
+                                         lambda_=1.0, alpha=0.1, num_iters=100)
+    print(fold_scores.to_string(index=False))
+    print(scores)
@@ -0,0 +1,248 @@
+"""
+Memory-mapped feature store for csv datasets like housing.csv.
+
+The csv is parsed once (in chunks) and written to a folder of .npy files:
+- x.npy: numeric features stored column by column (fortran order)
+- y.npy: target values
+- <column>_codes.npy: integer codes for every categorical column
+- dropped_rows.npy: mask of the csv rows that were dropped for missing values
+- x_scaler.npz, y_scaler.npz: ZScoreScaler normalization statistics
+- meta.json: column names, categories and the size / modified time / sha256
+  of the source csv
+
+Later runs open the .npy files with np.load(mmap_mode='r') so nothing is parsed
+or copied. If the source csv changes, the store is rebuilt automatically.
+
+Example:
+    store = open_feature_store('housing.csv', target='median_house_value')
+    x_normalized = store.x_scaler.transform(store.x)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from tools import ZScoreScaler
+
+STORE_VERSION = 2
+
+
+class FeatureStore:
+    """
+    Read-only view of a feature store folder. x, y, dropped_rows and the categorical
+    codes are memory-mapped arrays.
+    """
+
+    def __init__(self, store_dir: str):
+        """
+        Opens the arrays of an existing store without reading them into memory.
+
+        Input:
+            store_dir: folder created by build_feature_store
+        """
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json'), encoding='utf-8') as f:
+            self.meta: dict = json.load(f)
+
+        self.target: str = self.meta['target']
+        self.feature_names: list[str] = self.meta['feature_names']
+        self.categories: dict[str, list[str]] = self.meta['categories']
+
+        self.x: np.memmap = np.load(os.path.join(store_dir, 'x.npy'), mmap_mode='r')
+        self.y: np.memmap = np.load(os.path.join(store_dir, 'y.npy'), mmap_mode='r')
+        self.dropped_rows: np.memmap = np.load(os.path.join(store_dir, 'dropped_rows.npy'), mmap_mode='r')
+        self.codes: dict[str, np.memmap] = {
+            name: np.load(os.path.join(store_dir, f"{name}_codes.npy"), mmap_mode='r')
+            for name in self.categories}
+
+        # precomputed zscore normalization statistics
+        self.x_scaler = ZScoreScaler.load(os.path.join(store_dir, 'x_scaler.npz'))
+        self.y_scaler = ZScoreScaler.load(os.path.join(store_dir, 'y_scaler.npz'))
+
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Rebuilds the cleaned csv (after dropna) as a dataframe with the original
+        column order. Categorical columns are pandas categoricals built from their codes.
+
+        Output: dataframe with the features, categorical columns and target
+        """
+        columns = {name: self.x[:, j] for j, name in enumerate(self.feature_names)}
+        columns[self.target] = self.y
+        for name, categories in self.categories.items():
+            columns[name] = pd.Categorical.from_codes(self.codes[name], categories=categories)
+        return pd.DataFrame(columns)[self.meta['columns']]
+
+
+def file_fingerprint(path: str, with_hash: bool = True) -> dict:
+    """
+    Returns the size, modified time and (optionally) sha256 of a file.
+
+    Inputs:
+        path: path to the file
+        with_hash: also hash the file contents
+
+    Output: dictionary with 'size', 'mtime_ns' and 'sha256'
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': None}
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        fingerprint['sha256'] = sha.hexdigest()
+    return fingerprint
+
+
+def build_feature_store(csv_path: str,
+                        store_dir: str,
+                        target: str,
+                        dtype: npt.DTypeLike = np.float64,
+                        chunksize: int = 50000) -> FeatureStore:
+    """
+    Converts a csv file into a feature store. Numeric columns other than the target
+    become features and text columns are stored as categorical codes. Rows with
+    missing values are dropped (like dataframe.dropna()).
+
+    The csv is read twice in chunks (once to count rows and find the categories,
+    once to write the values) so it never has to fit in memory.
+
+    Inputs:
+        csv_path: path to the csv file
+        store_dir: folder to write the store to (replaced if it exists)
+        target: name of the target column
+        dtype: float32 or float64 for the features and target
+        chunksize: number of rows read from the csv at a time
+
+    Output: the opened FeatureStore
+    """
+    dtype = np.dtype(dtype)
+
+    # first pass: columns, row counts, missing value mask and categories
+    columns = None
+    categorical: list[str] = []
+    categories: dict[str, set] = {}
+    dropped_chunks = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        if columns is None:
+            columns = list(chunk.columns)
+            categorical = [name for name in columns
+                           if name != target and not pd.api.types.is_numeric_dtype(chunk[name])]
+            categories = {name: set() for name in categorical}
+        dropped = chunk.isna().any(axis=1).to_numpy()
+        dropped_chunks.append(dropped)
+        for name in categorical:
+            categories[name].update(chunk.loc[~dropped, name].astype(str).unique())
+
+    if columns is None:
+        raise ValueError(f"{csv_path} is empty")
+
+    dropped_rows = np.concatenate(dropped_chunks)
+    m = int(np.count_nonzero(~dropped_rows))
+    feature_names = [name for name in columns if name != target and name not in categorical]
+    category_lists = {name: sorted(values) for name, values in categories.items()}
+
+    # write into a temporary folder so a failed build never leaves a broken store
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    x = np.lib.format.open_memmap(os.path.join(tmp_dir, 'x.npy'), mode='w+', dtype=dtype,
+                                  shape=(m, len(feature_names)), fortran_order=True)
+    y = np.lib.format.open_memmap(os.path.join(tmp_dir, 'y.npy'), mode='w+', dtype=dtype, shape=(m,))
+    codes = {name: np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}_codes.npy"),
+                                             mode='w+', dtype=np.int32, shape=(m,))
+             for name in categorical}
+    np.save(os.path.join(tmp_dir, 'dropped_rows.npy'), dropped_rows)
+
+    # second pass: write the values and fit the scalers chunk by chunk
+    x_scaler = ZScoreScaler()
+    y_scaler = ZScoreScaler()
+    row = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk = chunk.dropna()
+        rows = slice(row, row + len(chunk))
+        x[rows] = chunk[feature_names].to_numpy(dtype=dtype)
+        y[rows] = chunk[target].to_numpy(dtype=dtype)
+        x_scaler.partial_fit(x[rows])
+        y_scaler.partial_fit(y[rows])
+        for name in categorical:
+            codes[name][rows] = pd.Categorical(chunk[name].astype(str),
+                                               categories=category_lists[name]).codes
+        row += len(chunk)
+
+    x_scaler.save(os.path.join(tmp_dir, 'x_scaler.npz'))
+    y_scaler.save(os.path.join(tmp_dir, 'y_scaler.npz'))
+
+    meta = {
+        'version': STORE_VERSION,
+        'source': file_fingerprint(csv_path),
+        'target': target,
+        'columns': columns,
+        'feature_names': feature_names,
+        'categories': category_lists,
+        'dtype': dtype.name,
+        'num_rows': m,
+    }
+
+    for array in (x, y, *codes.values()):
+        array.flush()
+    del x, y, codes
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return FeatureStore(store_dir)
+
+
+def open_feature_store(csv_path: str,
+                       target: str,
+                       store_dir: str | None = None,
+                       dtype: npt.DTypeLike = np.float64) -> FeatureStore:
+    """
+    Opens the feature store for csv_path, building it first if it doesn't exist,
+    was built with different settings, or the csv has changed since it was built.
+
+    The csv's size and modified time are checked first. The csv is only hashed
+    when those differ, so an unchanged (or only touched) csv isn't rebuilt.
+
+    Inputs:
+        csv_path: path to the csv file
+        target: name of the target column
+        store_dir: folder of the store (defaults to '<csv name>_store' next to the csv)
+        dtype: float32 or float64 for the features and target
+
+    Output: the opened FeatureStore
+    """
+    if store_dir is None:
+        store_dir = os.path.splitext(csv_path)[0] + '_store'
+    meta_path = os.path.join(store_dir, 'meta.json')
+
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+
+        same_settings = (meta.get('version') == STORE_VERSION
+                         and meta['target'] == target
+                         and meta['dtype'] == np.dtype(dtype).name)
+        if same_settings:
+            current = file_fingerprint(csv_path, with_hash=False)
+            source = meta['source']
+            if current['size'] == source['size'] and current['mtime_ns'] == source['mtime_ns']:
+                return FeatureStore(store_dir)
+
+            current = file_fingerprint(csv_path)
+            if current['sha256'] == source['sha256']:
+                # contents are unchanged, only remember the new modified time
+                meta['source'] = current
+                with open(meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f, indent=2)
+                return FeatureStore(store_dir)
+
+    return build_feature_store(csv_path, store_dir, target, dtype)
@@ -0,0 +1,119 @@
+"""
+Instrumentation for gradient_descent in tools.py.
+
+TraceRecorder is a callback that records the per-iteration stats gradient_descent
+reports (wall time, gradient / cost time, gradient norm, cost and step size) into
+numpy arrays, writes them to a compact trace file and summarizes where the
+training time went.
+
+Example:
+    recorder = TraceRecorder()
+    w, b, _ = gradient_descent(x, y, w, b, lambda_, alpha, num_iters, callback=recorder)
+    recorder.save('trace.npz')
+    print(recorder.summary())
+"""
+
+import numpy as np
+
+TRACE_FIELDS = ('seconds', 'gradient_seconds', 'cost_seconds', 'grad_norm', 'cost', 'step_size')
+
+
+class TraceRecorder:
+    """
+    Low overhead gradient_descent callback. Values are written into preallocated
+    float arrays that double in size when they're full, so recording an iteration
+    doesn't allocate a new python object per field.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Input:
+            capacity: number of iterations to allocate room for up front
+        """
+        self.count = 0
+        self.iteration = np.zeros(capacity, dtype=np.int64)
+        self.fields = {name: np.zeros(capacity, dtype=np.float64) for name in TRACE_FIELDS}
+
+
+    def __call__(self, info: dict) -> None:
+        """
+        Records the stats of one iteration (called by gradient_descent).
+
+        Input:
+            info: dictionary of iteration stats from gradient_descent
+        """
+        if self.count == self.iteration.shape[0]:
+            self._grow()
+        i = self.count
+        self.iteration[i] = info['iteration']
+        for name, values in self.fields.items():
+            values[i] = info[name]
+        self.count += 1
+
+
+    def _grow(self) -> None:
+        capacity = max(2 * self.iteration.shape[0], 1)
+        self.iteration = np.resize(self.iteration, capacity)
+        self.fields = {name: np.resize(values, capacity) for name, values in self.fields.items()}
+
+
+    def trace(self) -> dict:
+        """
+        Output: the recorded arrays (iteration plus every field in TRACE_FIELDS)
+        """
+        trace = {'iteration': self.iteration[:self.count]}
+        trace.update({name: values[:self.count] for name, values in self.fields.items()})
+        return trace
+
+
+    def save(self, path: str) -> None:
+        """
+        Writes the trace to a compressed .npz file. Timings and stats are stored as
+        float32, which is plenty of precision for a trace and halves the size.
+
+        Input:
+            path: file path
+        """
+        trace = self.trace()
+        np.savez_compressed(path,
+                            iteration=trace['iteration'].astype(np.int32),
+                            **{name: trace[name].astype(np.float32) for name in TRACE_FIELDS})
+
+
+    @staticmethod
+    def load(path: str) -> dict:
+        """
+        Loads a trace written by save.
+
+        Input:
+            path: file path
+
+        Output: dictionary of the recorded arrays
+        """
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+
+    def summary(self) -> dict:
+        """
+        Summarizes where the time went: total, gradient, cost and everything else
+        (the parameter update and loop overhead), plus how the training ended.
+
+        Output: dictionary of summary stats
+        """
+        trace = self.trace()
+        total = float(np.sum(trace['seconds']))
+        gradient = float(np.sum(trace['gradient_seconds']))
+        cost = float(np.sum(trace['cost_seconds']))
+        costs = trace['cost'][~np.isnan(trace['cost'])]
+
+        return {'iterations': self.count,
+                'total_seconds': total,
+                'gradient_seconds': gradient,
+                'cost_seconds': cost,
+                'other_seconds': total - gradient - cost,
+                'gradient_percent': 100 * gradient / total if total else 0.,
+                'cost_percent': 100 * cost / total if total else 0.,
+                'mean_iteration_ms': 1e3 * total / self.count if self.count else 0.,
+                'final_grad_norm': float(trace['grad_norm'][-1]) if self.count else None,
+                'last_cost': float(costs[-1]) if costs.size else None}
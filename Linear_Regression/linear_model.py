@@ -0,0 +1,148 @@
+"""
+Persistent linear regression model built on the functions in tools.py.
+
+A LinearModel holds the trained w and b plus the zscore statistics of the features
+(and optionally the target), so it can be saved after training and used to score new
+data without retraining.
+
+Example:
+    model = LinearModel(w, b, x_scaler, y_scaler, feature_names)
+    model.save('housing_model.npz')
+
+    model = LinearModel.load('housing_model.npz')
+    predictions = model.predict(x)
+    for chunk_predictions in model.predict_stream('new_houses.csv'):
+        ...
+"""
+
+from collections.abc import Iterator, Sequence
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from tools import ZScoreScaler
+
+MODEL_VERSION = 1
+
+
+class LinearModel:
+    """
+    Trained linear regression model: prediction = ((x - x_mu) / x_sigma) * w + b,
+    then converted back to the target's units with y_mu and y_sigma if the model was
+    trained on a normalized target.
+    """
+
+    __slots__ = ('w', 'b', 'x_mu', 'x_sigma', 'y_mu', 'y_sigma', 'feature_names')
+
+    def __init__(self,
+                 w: npt.NDArray,
+                 b: float,
+                 x_scaler: ZScoreScaler | None = None,
+                 y_scaler: ZScoreScaler | None = None,
+                 feature_names: Sequence[str] | None = None):
+        """
+        Inputs:
+            w: trained model parameters
+            b: trained model parameter
+            x_scaler: scaler the training features were normalized with (None if they weren't)
+            y_scaler: scaler the training target was normalized with (None if it wasn't)
+            feature_names: names of the feature columns, used by predict_stream
+        """
+        n = len(w)
+        self.w = np.asarray(w, dtype=np.float64)
+        self.b = float(b)
+        self.x_mu = x_scaler.mu if x_scaler is not None else np.zeros(n)
+        self.x_sigma = x_scaler.sigma if x_scaler is not None else np.ones(n)
+        self.y_mu = float(y_scaler.mu) if y_scaler is not None else 0.
+        self.y_sigma = float(y_scaler.sigma) if y_scaler is not None else 1.
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+
+    def _folded_parameters(self) -> tuple[npt.NDArray, float]:
+        """
+        Folds the normalization into the parameters so predicting is one matrix-vector
+        product on the raw features:
+            y = (x * (w / x_sigma) + b - x_mu * (w / x_sigma)) * y_sigma + y_mu
+        """
+        w_raw = self.w / self.x_sigma
+        b_raw = self.b - np.dot(self.x_mu, w_raw)
+        return w_raw * self.y_sigma, b_raw * self.y_sigma + self.y_mu
+
+
+    def predict(self, x: npt.NDArray) -> npt.NDArray:
+        """
+        Predicts every row of x at once. x is the raw (not normalized) features
+        and isn't copied or changed.
+
+        Input:
+            x: features, shape (m, n)
+
+        Output: predictions in the target's original units, shape (m,)
+        """
+        w, b = self._folded_parameters()
+        return x @ w + b
+
+
+    def predict_stream(self,
+                       csv_path: str,
+                       chunksize: int = 100000) -> Iterator[npt.NDArray]:
+        """
+        Predicts a csv file chunk by chunk so the file never has to fit in memory.
+        Only the feature columns are read. Rows with missing features get nan.
+
+        Inputs:
+            csv_path: csv with (at least) the feature_names columns
+            chunksize: number of rows predicted at a time
+
+        Output: predictions for every chunk
+        """
+        if self.feature_names is None:
+            raise ValueError("predict_stream needs a model saved with feature_names")
+
+        w, b = self._folded_parameters()
+        for chunk in pd.read_csv(csv_path, usecols=self.feature_names, chunksize=chunksize):
+            x = chunk[self.feature_names].to_numpy(dtype=np.float64)
+            yield x @ w + b
+
+
+    def save(self, path: str) -> None:
+        """
+        Saves the model to a small binary .npz file.
+
+        Input:
+            path: file path
+        """
+        arrays = {'version': np.array(MODEL_VERSION),
+                  'w': self.w,
+                  'b': np.array(self.b),
+                  'x_mu': self.x_mu,
+                  'x_sigma': self.x_sigma,
+                  'y_mu': np.array(self.y_mu),
+                  'y_sigma': np.array(self.y_sigma)}
+        if self.feature_names is not None:
+            arrays['feature_names'] = np.array(self.feature_names, dtype=np.str_)
+        np.savez(path, **arrays)
+
+
+    @classmethod
+    def load(cls, path: str) -> 'LinearModel':
+        """
+        Loads a model saved with save.
+
+        Input:
+            path: file path
+
+        Output: the model
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != MODEL_VERSION:
+                raise ValueError(f"{path} has model version {int(data['version'])}, "
+                                 f"expected {MODEL_VERSION}")
+            model = cls.__new__(cls)
+            model.w = data['w']
+            model.b = float(data['b'])
+            model.x_mu = data['x_mu']
+            model.x_sigma = data['x_sigma']
+            model.y_mu = float(data['y_mu'])
+            model.y_sigma = float(data['y_sigma'])
+            model.feature_names = data['feature_names'].tolist() if 'feature_names' in data else None
+        return model
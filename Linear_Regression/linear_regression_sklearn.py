@@ -4,8 +4,8 @@ dataset from sklearn.
 """
 
 import matplotlib.pyplot as plt
-import pandas as pd
 import seaborn as sns
+from feature_store import open_feature_store
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LinearRegression
@@ -13,9 +13,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler, OneHotEncoder
 
-# get housing data
-housing = pd.read_csv('housing.csv')
-housing = housing.dropna()
+# get housing data from the memory-mapped feature store (rows with missing data are dropped)
+housing = open_feature_store('housing.csv', target='median_house_value').to_dataframe()
 
 data = housing.drop(labels=['median_house_value'], axis=1)
 target = housing['median_house_value']
@@ -14,32 +14,28 @@ L2 Regularization or Ridge Regression.
 The functions used here are in the tools.py file.
 
 Steps
-1. load the csv
+1. load the csv (from the memory-mapped feature store)
 2. clean the data
 3. use z-score normalization to get values within
    range to run gradient descent
-4. run gradient descent to find optimal w and b values
+4. run gradient descent (or solve directly with ridge_solve) to find optimal w and b values
 5. make predictions model
 6. calculate model accuracy
+7. save the model (linear_model.py) to predict new data without retraining
 """
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import seaborn as sns
+from feature_store import open_feature_store
+from linear_model import LinearModel
 from sklearn.metrics import mean_squared_error
-from tools import compute_gradient, gradient_descent, zscore_normalization
+from tools import BlockDesign, compute_gradient, gradient_descent, one_hot_encode, ridge_solve
 
-# load csv into a pandas dataframe
-data = pd.read_csv('housing.csv')
-
-# drop rows with missing data
-data = data.dropna()
-
-# target values -> 'median_house_value' column
-# dropping 'ocean_proximity' as it's a categorical value with no numbers
-x_train = data.drop(labels=['median_house_value', 'ocean_proximity'], axis=1)
-y_train = data['median_house_value']
+# open the memory-mapped feature store (the csv is only parsed the first time
+# or when it changes). rows with missing data are already dropped
+store = open_feature_store('housing.csv', target='median_house_value')
+data = store.to_dataframe()
 
 # Data Visualization ------------------------------------------------------
 
@@ -63,28 +59,33 @@ plt.show()
 
 # -------------------------------------------------------------------------
 
-# convert to numpy arrays for calculations
-x = x_train.to_numpy()
-y = y_train.to_numpy()
+# numpy arrays for calculations
+# target values -> 'median_house_value' column
+# 'ocean_proximity' isn't in x as it's a categorical value with no numbers
+x = store.x
+y = store.y
 w = np.random.rand(x.shape[1])
 b = 0.0
 alpha = 0.1
 lambda_tmp = 1.0
 
+# 'gradient_descent' or a ridge_solve solver ('auto', 'cholesky', 'cg') to fit directly
+solver = 'gradient_descent'
+
 # Testing x normalized -----------------------------------------------------
 
-x_normalized = zscore_normalization(x)
+x_normalized = store.x_scaler.transform(x)
 dj_dw, dj_db = compute_gradient(x_normalized, y, w, b, lambda_tmp)
 iterations = 100
 cost_history = []
-w, b, cost_history = gradient_descent(x_normalized, y, dj_dw, dj_db, lambda_tmp, alpha, iterations)
-
-# predictions model
-m = x.shape[0]
-prediction = np.zeros(m,)
+if solver == 'gradient_descent':
+    w, b, cost_history = gradient_descent(x_normalized, y, dj_dw, dj_db, lambda_tmp, alpha, iterations)
+else:
+    w, b = ridge_solve(x_normalized, y, lambda_tmp, solver)
 
-for i in range(m):
-    prediction[i] = np.dot(x_normalized[i], w) + b
+# predictions model (the model normalizes the raw features itself)
+model = LinearModel(w, b, store.x_scaler, feature_names=store.feature_names)
+prediction = model.predict(x)
 
 # print 10 predicted samples
 for i in range(10):
@@ -101,19 +102,18 @@ print(f"Root mse: {rmse}")
 w_norm = np.random.rand(x.shape[1])
 b_norm = 0.0
 
-y_normalized = zscore_normalization(y)
+y_normalized = store.y_scaler.transform(y)
 dj_dw_norm, dj_db_norm = compute_gradient(x_normalized, y_normalized, w_norm, b_norm, lambda_tmp)
 cost_history = []
-w_norm, b_norm, cost_history = gradient_descent(x_normalized, y_normalized,
-                                                dj_dw_norm, dj_db_norm,
-                                                lambda_tmp, alpha, iterations)
+if solver == 'gradient_descent':
+    w_norm, b_norm, cost_history = gradient_descent(x_normalized, y_normalized,
+                                                    dj_dw_norm, dj_db_norm,
+                                                    lambda_tmp, alpha, iterations)
+else:
+    w_norm, b_norm = ridge_solve(x_normalized, y_normalized, lambda_tmp, solver)
 
 # predictions model
-m = x.shape[0]
-prediction_norm = np.zeros(m,)
-
-for i in range(m):
-    prediction_norm[i] = np.dot(x_normalized[i], w_norm) + b_norm
+prediction_norm = x_normalized @ w_norm + b_norm
 
 # print 10 predicted samples
 for i in range(10):
@@ -124,3 +124,25 @@ mse = mean_squared_error(y_normalized, prediction_norm)
 rmse= np.sqrt(mse)
 print(f"The mean squared error: {mse}")
 print(f"Root mse: {rmse}")
+
+# convert the normalized predictions back to dollars with the target's scaler
+prediction_dollars = store.y_scaler.inverse_transform(prediction_norm)
+print(f"Root mse in dollars: {np.sqrt(mean_squared_error(y, prediction_dollars)):0.2f}")
+
+# save the model so new data can be scored without retraining
+# (LinearModel.load('housing_model.npz').predict(x) predicts in dollars)
+model_norm = LinearModel(w_norm, b_norm, store.x_scaler, store.y_scaler, store.feature_names)
+model_norm.save('housing_model.npz')
+
+# Testing with 'ocean_proximity' one-hot encoded -------------------------------------
+
+# the one-hot columns are a sparse block next to the dense normalized features,
+# tools.py does the gradient math without building the dense matrix
+ocean_proximity = one_hot_encode(store.codes['ocean_proximity'], len(store.categories['ocean_proximity']))
+x_categorical = BlockDesign(x_normalized, ocean_proximity)
+
+w_cat, b_cat, cost_history = gradient_descent(x_categorical, y_normalized,
+                                              np.zeros(x_categorical.shape[1]), 0.,
+                                              lambda_tmp, alpha, iterations)
+prediction_cat = store.y_scaler.inverse_transform(x_categorical @ w_cat + b_cat)
+print(f"Root mse in dollars with ocean_proximity: {np.sqrt(mean_squared_error(y, prediction_cat)):0.2f}")
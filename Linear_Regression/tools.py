@@ -1,19 +1,144 @@
 """
 Tools file containing functions for:
+- computing the residual (prediction error) for every sample
 - computing cost
+- computing cost and gradient together from one residual
 - computing gradient descent parameters w and b
 - computing gradient descent
+- gradient descent with early stopping, momentum / nesterov, adam and line search
+- training a grid of (alpha, lambda_) models at once
+- streaming mini-batch / stochastic gradient descent over a csv file
+- solving ridge regression directly (cholesky or conjugate gradient)
+- zscore normalization (ZScoreScaler keeps the statistics for new data)
+- sparse / mixed dense + sparse training data (one hot encoded categorical features)
+- logistic regression: stable sigmoid and log loss, newton (IRLS) and mini-batch
+  solvers, and LogisticRegressionModel which can replace sklearn's LogisticRegression
+
+compute_cost, compute_gradient, gradient_descent and the other solvers only use
+x through matrix products (x @ w and x.T @ err), so x can be a numpy array, a
+scipy sparse matrix (ex. from one_hot_encode) or a BlockDesign. Sparse data is
+never converted into a dense matrix.
 
 TODO:
-- logistic regression (could use gradient descent but add name specifier parameter)
-- sigmoid function
 - plotting stuff?
 """
 
 import copy
+import itertools
 import math
+import time
+import warnings
+from collections.abc import Callable, Iterator, Sequence
 import numpy as np
 import numpy.typing as npt
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.utils.validation import check_is_fitted
+
+
+class BlockDesign:
+    """
+    Training data made of a dense block of numeric features next to a sparse block
+    (ex. one hot encoded categories), used like the matrix [dense | sparse] without
+    ever building it. Supports x @ v, x.T @ u, x.shape, x.mean(axis=0) and row
+    indexing (x[rows], used for mini-batches), which is everything the functions in
+    this file need.
+    """
+
+    def __init__(self, dense: npt.NDArray, sparse: sp.spmatrix):
+        """
+        Inputs:
+            dense: numeric features, shape (m, n_dense)
+            sparse: sparse features, shape (m, n_sparse)
+        """
+        if dense.shape[0] != sparse.shape[0]:
+            raise ValueError(f"dense has {dense.shape[0]} rows but sparse has {sparse.shape[0]}")
+        self.dense = dense
+        self.sparse = sp.csr_matrix(sparse)
+
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.dense.shape[0], self.dense.shape[1] + self.sparse.shape[1]
+
+
+    @property
+    def T(self) -> '_TransposedBlockDesign':
+        return _TransposedBlockDesign(self)
+
+
+    def __matmul__(self, v: npt.NDArray) -> npt.NDArray:
+        n_dense = self.dense.shape[1]
+        return self.dense @ v[:n_dense] + self.sparse @ v[n_dense:]
+
+
+    def __getitem__(self, rows) -> 'BlockDesign':
+        """
+        Selects rows of both blocks (x[rows] with an index array, mask or slice).
+        Column indexing isn't supported.
+        """
+        if isinstance(rows, tuple):
+            raise TypeError("BlockDesign only supports row indexing, ex. x[rows]")
+        return BlockDesign(self.dense[rows], self.sparse[rows])
+
+
+    def mean(self, axis: int = 0) -> npt.NDArray:
+        if axis != 0:
+            raise ValueError("BlockDesign only supports mean(axis=0)")
+        return np.concatenate((np.mean(self.dense, axis=0),
+                               np.asarray(self.sparse.mean(axis=0)).ravel()))
+
+
+class _TransposedBlockDesign:
+    """
+    x.T of a BlockDesign, only supports x.T @ u.
+    """
+
+    def __init__(self, block: BlockDesign):
+        self.block = block
+
+
+    def __matmul__(self, u: npt.NDArray) -> npt.NDArray:
+        return np.concatenate((self.block.dense.T @ u, self.block.sparse.T @ u))
+
+
+def one_hot_encode(codes: npt.NDArray, num_categories: int | None = None) -> sp.csr_matrix:
+    """
+    One hot encodes integer category codes (ex. FeatureStore.codes['ocean_proximity'])
+    as a sparse matrix with a single 1 per row. Memory grows with the number of
+    samples, not the number of categories.
+
+    Inputs:
+        codes: category code of every sample (0 to num_categories - 1)
+        num_categories: number of columns (defaults to max(codes) + 1)
+
+    Output: sparse matrix of shape (m, num_categories)
+    """
+    codes = np.asarray(codes)
+    m = codes.shape[0]
+    if num_categories is None:
+        num_categories = int(codes.max()) + 1 if m else 0
+    return sp.csr_matrix((np.ones(m), codes, np.arange(m + 1)), shape=(m, num_categories))
+
+
+def compute_residual(x: npt.NDArray,
+                     y: npt.NDArray,
+                     w: npt.NDArray,
+                     b: float) -> npt.NDArray:
+    """
+    Computes the prediction error (f_wb(x_i) - y_i) for every sample with one
+    matrix-vector product instead of looping over the samples.
+
+    Inputs:
+        x: training data (numpy array, scipy sparse matrix or BlockDesign)
+        y: target values
+        w: model parameters
+        b: model parameter
+
+    Output: residual vector of shape (m,)
+    """
+    return x @ w + b - y
 
 
 def compute_cost(x: npt.NDArray,
@@ -39,23 +164,16 @@ def compute_cost(x: npt.NDArray,
     Outputs: total cost with regularization over all samples
     """
     m = x.shape[0]
-    n = len(w)
-    cost = 0.
 
     # calculate cost over training data
-    for i in range(m):
-        f_wb_i = np.dot(x[i], w) + b
-        cost = cost + (f_wb_i - y[i])**2
-    cost = cost / (2 * m)
+    err = compute_residual(x, y, w, b)
+    cost = np.dot(err, err) / (2 * m)
 
     # calculate regularization value
-    reg_cost = 0.
-    for i in range(n):
-        reg_cost += (w[i]**2)
-    reg_cost = (lambda_ / (2 * m)) * reg_cost
+    reg_cost = (lambda_ / (2 * m)) * np.dot(w, w)
 
     total_cost = cost + reg_cost
-    return total_cost
+    return float(total_cost)
 
 
 def compute_gradient(x: npt.NDArray,
@@ -75,93 +193,1206 @@ def compute_gradient(x: npt.NDArray,
 
     Output: the derivative of w and b (dj_dw and dj_db) over all samples
     """
-    m, n = x.shape
-    dj_dw = np.zeros((n,))
-    dj_db = 0.
-
-    # calculate cost and update dj_dw array
-    for i in range(m):
-        cost = (np.dot(x[i], w) + b) - y[i]
-        for j in range(n):
-            dj_dw[j] = dj_dw[j] + cost * x[i, j]
-        dj_db += cost
+    m = x.shape[0]
 
-    dj_dw = dj_dw / m
-    dj_db = dj_db / m
+    # calculate error for every sample at once, then dj_dw = X^T * err
+    err = compute_residual(x, y, w, b)
+    dj_dw = (x.T @ err) / m
+    dj_db = float(np.sum(err)) / m
 
     # calculate regularization value
-    for i in range(n):
-        dj_dw[i] = dj_dw[i] + (lambda_ / m) * w[i]
+    dj_dw = dj_dw + (lambda_ / m) * w
 
     return dj_dw, dj_db
 
 
+def compute_cost_and_gradient(x: npt.NDArray,
+                              y: npt.NDArray,
+                              w: npt.NDArray,
+                              b: float,
+                              lambda_: float,
+                              timings: dict | None = None) -> tuple[float, npt.NDArray, float]:
+    """
+    Fused version of compute_cost and compute_gradient. The residual vector
+    (x * w + b - y) is computed once and used for both the cost and the gradient,
+    so one gradient descent step only goes over the training data once.
+
+    Inputs:
+        x: training data
+        y: target values
+        w: model parameters
+        b: model parameter
+        lambda_: controls amount of regularization applied
+        timings: if given, 'gradient' and 'cost' are set to the seconds spent on
+                 each (the residual counts as gradient time)
+
+    Outputs:
+        total_cost: cost with regularization over all samples
+        dj_dw: derivative of the cost with respect to w
+        dj_db: derivative of the cost with respect to b
+    """
+    if timings is not None:
+        start = time.perf_counter()
+
+    m = x.shape[0]
+    err = compute_residual(x, y, w, b)
+    dj_dw = (x.T @ err) / m + (lambda_ / m) * w
+    dj_db = float(np.sum(err)) / m
+
+    if timings is not None:
+        gradient_done = time.perf_counter()
+
+    total_cost = (np.dot(err, err) + lambda_ * np.dot(w, w)) / (2 * m)
+
+    if timings is not None:
+        timings['gradient'] = gradient_done - start
+        timings['cost'] = time.perf_counter() - gradient_done
+
+    return float(total_cost), dj_dw, dj_db
+
+
 def gradient_descent(x: npt.NDArray,
                      y: npt.NDArray,
                      w: npt.NDArray,
                      b: float,
                      lambda_: float,
                      alpha: float,
-                     num_iters: int) -> tuple[npt.NDArray, float, list]:
+                     num_iters: int,
+                     cost_every: int | str | None = 1,
+                     max_history: int = 100000,
+                     callback: Callable[[dict], None] | None = None,
+                     verbose: bool = True) -> tuple[npt.NDArray, float, list]:
     """
-    Uses compute_cost function to store cost values for printing.
-    Uses compute_gradient function to get best w and b values to
-    implement gradient descent.
+    Uses compute_cost_and_gradient to get the cost and the gradient from one pass
+    over the training data, then updates w and b to implement gradient descent.
+
+    The cost is only computed on the iterations it's logged, which is controlled
+    by cost_every:
+        - k (int): every k iterations, plus once after the last update
+        - 'end': only once after the last update
+        - None: never (cost_history is empty)
+
+    Each logged value is the cost of w and b before that iteration's update,
+    the last value is the cost of the returned w and b.
+
+    If callback is given it's called after every iteration with a dictionary:
+        - 'iteration': iteration number
+        - 'seconds': wall time of the whole iteration
+        - 'gradient_seconds': time spent computing dj_dw and dj_db
+        - 'cost_seconds': time spent computing the cost (0 if it wasn't computed)
+        - 'grad_norm': norm of (dj_dw, dj_db)
+        - 'cost': cost before the update (nan if it wasn't computed)
+        - 'step_size': learning rate used for the update
+    instrumentation.TraceRecorder is a built-in callback that records these.
 
     Inputs:
         x: training data
         y: target values
         w: model parameters
         b: model parameter
+        lambda_: controls amount of regularization applied
         alpha: learning rate
         num_iters: how many iterations to run gradient descent
+        cost_every: how often the cost is computed and saved
+        max_history: maximum number of cost values kept in cost_history
+        callback: function called with the stats of every iteration
+        verbose: print the cost every 10% of the iterations
 
     Outputs:
         w: updated values
         b: updated value
         cost_history: list of cost values
     """
+    if isinstance(cost_every, str) and cost_every != 'end':
+        raise ValueError(f"cost_every must be an int, 'end' or None, not {cost_every!r}")
+    if isinstance(cost_every, int) and cost_every < 1:
+        raise ValueError(f"cost_every must be at least 1, not {cost_every}")
+
+    log_every = cost_every if isinstance(cost_every, int) else 0
+    print_every = math.ceil(num_iters / 10)
+    next_print = 0
+
     cost_history = []
     w_in = copy.deepcopy(w) # don't want to change the value
     b_in = b
 
+    # only time the iterations when someone is listening
+    timings = {'gradient': 0., 'cost': 0.} if callback is not None else None
+
     for i in range(num_iters):
+        if callback is not None:
+            start = time.perf_counter()
+            cost = math.nan
+            timings['cost'] = 0.
+
+        if log_every and i % log_every == 0:
+            # compute cost, dj_dw and dj_db from the same residual
+            cost, dj_dw, dj_db = compute_cost_and_gradient(x, y, w_in, b_in, lambda_, timings)
+            if len(cost_history) < max_history:
+                cost_history.append(cost)
 
-        # compute dj_dw and dj_db
-        dj_dw, dj_db = compute_gradient(x, y, w_in, b_in, lambda_)
+            # print the first cost logged in every 10% of the iterations
+            if verbose and i >= next_print:
+                print(f"Iteration {i:4d}: Cost {cost:8.2f}")
+                next_print = i - i % print_every + print_every
+        elif callback is not None:
+            dj_dw, dj_db = compute_gradient(x, y, w_in, b_in, lambda_)
+            timings['gradient'] = time.perf_counter() - start
+        else:
+            dj_dw, dj_db = compute_gradient(x, y, w_in, b_in, lambda_)
 
         # implement gradient descent algorithm
         w_in = w_in - alpha * dj_dw
         b_in = b_in - alpha * dj_db
 
-        # save cost value at every iteration
-        if i < 100000:
-            cost_history.append(compute_cost(x, y, w_in, b_in, lambda_))
+        if callback is not None:
+            seconds = time.perf_counter() - start
+            callback({'iteration': i,
+                      'seconds': seconds,
+                      'gradient_seconds': timings['gradient'],
+                      'cost_seconds': timings['cost'],
+                      'grad_norm': math.sqrt(np.dot(dj_dw, dj_dw) + dj_db**2),
+                      'cost': cost,
+                      'step_size': alpha})
+
+    # save cost of the final w and b
+    if cost_every is not None and len(cost_history) < max_history:
+        cost_history.append(compute_cost(x, y, w_in, b_in, lambda_))
+
+    return w_in, b_in, cost_history
+
+
+OPTIMIZERS = ('gd', 'momentum', 'nesterov', 'adam', 'line_search')
+
+# optimize_gradient_descent treats a cost this many times its starting value (or a
+# gradient norm sqrt(DIVERGENCE_FACTOR) times its starting value) as diverged
+DIVERGENCE_FACTOR = 1e6
+
+
+def optimize_gradient_descent(x: npt.NDArray,
+                              y: npt.NDArray,
+                              w: npt.NDArray,
+                              b: float,
+                              lambda_: float,
+                              alpha: float,
+                              num_iters: int,
+                              optimizer: str = 'gd',
+                              grad_tol: float | None = None,
+                              cost_tol: float | None = None,
+                              beta: float = 0.9,
+                              beta2: float = 0.999,
+                              epsilon: float = 1e-8,
+                              cost_every: int | None = 1,
+                              max_history: int = 100000,
+                              verbose: bool = True) -> tuple[npt.NDArray, float, list, int]:
+    """
+    Convergence aware version of gradient_descent. Stops as soon as the model has
+    converged (or diverged) instead of always running num_iters iterations.
+
+    Optimizers:
+        - 'gd': plain gradient descent with constant alpha
+        - 'momentum': heavy ball momentum, v = beta * v - alpha * grad
+        - 'nesterov': nesterov accelerated gradient (momentum with look ahead)
+        - 'adam': adam with first/second moment decay rates beta and beta2
+        - 'line_search': backtracking (armijo) line search starting from alpha,
+          so alpha doesn't have to be tuned. Stops when no step size above machine
+          epsilon lowers the cost enough.
+
+    Early stopping (both can be used, stops on whichever happens first):
+        - grad_tol: stop when the norm of (dj_dw, dj_db) is below grad_tol
+        - cost_tol: stop when the relative change in cost between two iterations
+          is below cost_tol
+    Training also stops as soon as it diverges: the gradient (computed every
+    iteration) becomes inf / nan or its norm grows to sqrt(DIVERGENCE_FACTOR) times
+    its starting value, or a computed cost becomes inf / nan or grows to
+    DIVERGENCE_FACTOR times the first computed cost. The parameters are then
+    returned as they are, and iterations tells how many updates ran before the stop.
+
+    Inputs:
+        x: training data
+        y: target values
+        w: model parameters
+        b: model parameter
+        lambda_: controls amount of regularization applied
+        alpha: learning rate (initial step size for 'line_search')
+        num_iters: maximum number of iterations
+        optimizer: one of OPTIMIZERS
+        grad_tol: gradient norm tolerance
+        cost_tol: relative cost change tolerance
+        beta: momentum / adam first moment decay rate
+        beta2: adam second moment decay rate
+        epsilon: adam term that avoids dividing by zero
+        cost_every: save the cost every cost_every iterations (None to never save)
+        max_history: maximum number of cost values kept in cost_history
+        verbose: print the cost every 10% of num_iters
+
+    Outputs:
+        w: updated values
+        b: updated value
+        cost_history: list of cost values (before each logged update, then final cost)
+        iterations: number of updates that were actually run (less than num_iters if
+                    training converged, diverged or the line search stopped)
+    """
+    if optimizer not in OPTIMIZERS:
+        raise ValueError(f"optimizer must be one of {OPTIMIZERS}, not {optimizer!r}")
+    if cost_every is not None and cost_every < 1:
+        raise ValueError(f"cost_every must be at least 1, not {cost_every}")
+
+    # w and b are updated together as one parameter vector [w, b]
+    params = np.append(np.asarray(w, dtype=np.float64), b)
+    velocity = np.zeros_like(params)
+    second_moment = np.zeros_like(params)
+    step_size = alpha
+
+    # the cost is needed every iteration for cost_tol, line search and divergence checks
+    always_cost = cost_tol is not None or optimizer == 'line_search'
+    print_every = math.ceil(num_iters / 10)
+    cost_history = []
+    prev_cost = None
+    start_cost = None
+    start_grad_norm = None
+    iterations = 0
+
+    for i in range(num_iters):
+        w_in, b_in = params[:-1], params[-1]
+        log_cost = cost_every is not None and i % cost_every == 0
+
+        if always_cost or log_cost or (verbose and i % print_every == 0):
+            cost, dj_dw, dj_db = compute_cost_and_gradient(x, y, w_in, b_in, lambda_)
+            if start_cost is None:
+                start_cost = cost
+            if not math.isfinite(cost) or cost > DIVERGENCE_FACTOR * start_cost:
+                if verbose:
+                    print(f"Iteration {i:4d}: cost diverged, stopping")
+                break
+            if log_cost and len(cost_history) < max_history:
+                cost_history.append(cost)
+            if verbose and i % print_every == 0:
+                print(f"Iteration {i:4d}: Cost {cost:8.2f}")
+        else:
+            cost = None
+            dj_dw, dj_db = compute_gradient(x, y, w_in, b_in, lambda_)
+        grad = np.append(dj_dw, dj_db)
+        grad_norm = float(np.linalg.norm(grad))
+        if start_grad_norm is None:
+            start_grad_norm = grad_norm
+
+        # the gradient is computed every iteration, so it catches divergence even
+        # when the cost isn't
+        if not math.isfinite(grad_norm) or grad_norm > math.sqrt(DIVERGENCE_FACTOR) * start_grad_norm:
+            if verbose:
+                print(f"Iteration {i:4d}: gradient diverged, stopping")
+            break
+
+        # check for convergence before updating
+        if grad_tol is not None and grad_norm <= grad_tol:
+            break
+        if cost_tol is not None and prev_cost is not None:
+            if abs(prev_cost - cost) <= cost_tol * max(abs(prev_cost), np.finfo(float).tiny):
+                break
+        prev_cost = cost
+
+        if optimizer == 'gd':
+            params = params - alpha * grad
+        elif optimizer == 'momentum':
+            velocity = beta * velocity - alpha * grad
+            params = params + velocity
+        elif optimizer == 'nesterov':
+            # nesterov update rewritten so it only needs the gradient at params
+            prev_velocity = velocity
+            velocity = beta * velocity - alpha * grad
+            params = params - beta * prev_velocity + (1 + beta) * velocity
+        elif optimizer == 'adam':
+            velocity = beta * velocity + (1 - beta) * grad
+            second_moment = beta2 * second_moment + (1 - beta2) * grad**2
+            velocity_hat = velocity / (1 - beta**(i + 1))
+            second_moment_hat = second_moment / (1 - beta2**(i + 1))
+            params = params - alpha * velocity_hat / (np.sqrt(second_moment_hat) + epsilon)
+        else:
+            # start from twice the last accepted step, halve until the cost decreases enough
+            step_size = min(alpha, 2 * step_size)
+            grad_norm_sq = np.dot(grad, grad)
+            accepted = False
+            while step_size > np.finfo(float).eps:
+                candidate = params - step_size * grad
+                if compute_cost(x, y, candidate[:-1], candidate[-1], lambda_) \
+                        <= cost - 0.5 * step_size * grad_norm_sq:
+                    accepted = True
+                    break
+                step_size *= 0.5
+            if not accepted:
+                # no step lowers the cost enough, keep the current params and stop
+                if verbose:
+                    print(f"Iteration {i:4d}: line search found no step that lowers the cost, stopping")
+                break
+            params = candidate
+
+        iterations += 1
+
+    w_out, b_out = params[:-1].copy(), float(params[-1])
+    if cost_every is not None and len(cost_history) < max_history:
+        cost_history.append(compute_cost(x, y, w_out, b_out, lambda_))
+
+    return w_out, b_out, cost_history, iterations
+
+
+def sweep_gradient_descent(x: npt.NDArray,
+                           y: npt.NDArray,
+                           alphas: Sequence[float],
+                           lambdas: Sequence[float],
+                           num_iters: int,
+                           w: npt.NDArray | None = None,
+                           b: float = 0.) -> pd.DataFrame:
+    """
+    Runs gradient_descent for every (alpha, lambda_) combination at the same time.
+    The k models' weights are stacked into an n x k matrix W so every iteration is
+    one matrix-matrix product over x for the whole grid:
+
+        E = x * W + B - y        (m x k residuals)
+        dJ/dW = x^T * E / m + (lambda_ / m) * W
+
+    A full regularization path costs about as much as a single fit.
+
+    Inputs:
+        x: training data
+        y: target values
+        alphas: learning rates to try
+        lambdas: regularization amounts to try
+        num_iters: how many iterations to run gradient descent
+        w: initial model parameters used by every model (zeros if None)
+        b: initial model parameter used by every model
+
+    Output:
+        results: dataframe with one row per combination in grid order (alphas outer,
+                 lambdas inner) and columns 'alpha', 'lambda_', 'cost' (regularized,
+                 so only comparable within one lambda_), 'train_cost' (unregularized,
+                 comparable across the grid), 'diverged' (the cost ended above the
+                 starting cost or overflowed to inf / nan), 'w', 'b'
+    """
+    m, n = x.shape
+    grid = list(itertools.product(alphas, lambdas))
+    k = len(grid)
+    alpha_vec = np.array([alpha for alpha, _ in grid], dtype=np.float64)
+    lambda_vec = np.array([lambda_ for _, lambda_ in grid], dtype=np.float64)
+
+    w_init = np.zeros(n) if w is None else np.asarray(w, dtype=np.float64)
+    w_grid = np.repeat(w_init[:, np.newaxis], k, axis=1)
+    b_grid = np.full(k, b, dtype=np.float64)
+    y_col = y.reshape(-1, 1)
+
+    # regularized cost at the starting parameters, a run that ends above it diverged
+    err = x @ w_grid + b_grid - y_col
+    initial_costs = (np.sum(err**2, axis=0) + lambda_vec * np.sum(w_grid**2, axis=0)) / (2 * m)
+
+    # a learning rate that's too large grows (or overflows) its column, which is reported in 'diverged'
+    with np.errstate(over='ignore', invalid='ignore'):
+        for _ in range(num_iters):
+            err = x @ w_grid + b_grid - y_col
+            dj_dw = (x.T @ err) / m + (lambda_vec / m) * w_grid
+            dj_db = np.sum(err, axis=0) / m
+
+            w_grid -= alpha_vec * dj_dw
+            b_grid -= alpha_vec * dj_db
+
+        # final unregularized and regularized cost of every model
+        err = x @ w_grid + b_grid - y_col
+        train_costs = np.sum(err**2, axis=0) / (2 * m)
+        costs = train_costs + lambda_vec * np.sum(w_grid**2, axis=0) / (2 * m)
+
+    finite = np.isfinite(costs) & np.all(np.isfinite(w_grid), axis=0) & np.isfinite(b_grid)
+    diverged = ~finite | (costs > initial_costs)
+
+    return pd.DataFrame({'alpha': alpha_vec,
+                         'lambda_': lambda_vec,
+                         'cost': costs,
+                         'train_cost': train_costs,
+                         'diverged': diverged,
+                         'w': list(w_grid.T),
+                         'b': b_grid})
+
+
+def read_csv_chunks(path: str,
+                    target: str,
+                    drop_columns: Sequence[str] = (),
+                    chunksize: int = 50000) -> Iterator[tuple[npt.NDArray, npt.NDArray]]:
+    """
+    Reads a csv file chunksize rows at a time so that the whole file never has to
+    fit in memory. Rows with missing values are dropped like data.dropna() does.
+
+    Inputs:
+        path: path to the csv file
+        target: name of the target column
+        drop_columns: columns that aren't used as features (ex. categorical columns)
+        chunksize: number of rows read from the file at a time
+
+    Output: (x, y) float arrays for every chunk
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = chunk.dropna()
+        y = chunk[target].to_numpy(dtype=np.float64)
+        x = chunk.drop(labels=[target, *drop_columns], axis=1).to_numpy(dtype=np.float64)
+        yield x, y
+
+
+def csv_feature_stats(path: str,
+                      target: str,
+                      drop_columns: Sequence[str] = (),
+                      chunksize: int = 50000) -> tuple[npt.NDArray, npt.NDArray, int]:
+    """
+    Computes the mean and standard deviation of every feature in one pass over the
+    csv file. Each chunk is merged into a ZScoreScaler, so memory only depends on
+    chunksize.
+
+    Inputs:
+        path: path to the csv file
+        target: name of the target column
+        drop_columns: columns that aren't used as features
+        chunksize: number of rows read from the file at a time
+
+    Outputs:
+        mu: mean of each feature
+        sigma: standard deviation of each feature
+        count: number of samples (rows without missing values)
+    """
+    scaler = ZScoreScaler()
+    for x, _ in read_csv_chunks(path, target, drop_columns, chunksize):
+        scaler.partial_fit(x)
+
+    if scaler.count == 0:
+        raise ValueError(f"{path} has no rows without missing values")
+
+    return scaler.mu, scaler.sigma, scaler.count
+
+
+def iter_minibatches(path: str,
+                     target: str,
+                     batch_size: int,
+                     drop_columns: Sequence[str] = (),
+                     chunksize: int = 50000,
+                     mu: npt.NDArray | None = None,
+                     sigma: npt.NDArray | None = None,
+                     rng: np.random.Generator | None = None) -> Iterator[tuple[npt.NDArray, npt.NDArray]]:
+    """
+    Streams shuffled mini-batches from a csv file. Every chunk is normalized with
+    mu and sigma (if given) as it's read, then its rows are shuffled and split into
+    batches. Rows left over at the end of a chunk are carried into the next chunk so
+    every batch except the last one has batch_size rows.
+
+    Inputs:
+        path: path to the csv file
+        target: name of the target column
+        batch_size: number of samples in each batch
+        drop_columns: columns that aren't used as features
+        chunksize: number of rows read from the file at a time
+        mu: mean of each feature used for zscore normalization
+        sigma: standard deviation of each feature used for zscore normalization
+        rng: random generator used to shuffle, rows aren't shuffled if None
+
+    Output: (x_batch, y_batch) for every batch
+    """
+    x_left = None
+    y_left = None
+
+    for x, y in read_csv_chunks(path, target, drop_columns, chunksize):
+        if mu is not None:
+            x -= mu
+            x /= sigma
+
+        if x_left is not None:
+            x = np.concatenate((x_left, x))
+            y = np.concatenate((y_left, y))
+
+        if rng is not None:
+            order = rng.permutation(x.shape[0])
+            x = x[order]
+            y = y[order]
+
+        full = x.shape[0] - x.shape[0] % batch_size
+        for start in range(0, full, batch_size):
+            yield x[start:start + batch_size], y[start:start + batch_size]
+        x_left = x[full:]
+        y_left = y[full:]
+
+    if x_left is not None and x_left.shape[0] > 0:
+        yield x_left, y_left
+
+
+def minibatch_gradient_descent(path: str,
+                               target: str,
+                               w: npt.NDArray,
+                               b: float,
+                               lambda_: float,
+                               alpha: float,
+                               num_epochs: int,
+                               batch_size: int = 256,
+                               drop_columns: Sequence[str] = (),
+                               chunksize: int = 50000,
+                               normalize: bool = True,
+                               seed: int | None = None) -> tuple[npt.NDArray, float, list]:
+    """
+    Out-of-core version of gradient_descent. Instead of loading the whole csv file,
+    the file is read chunk by chunk and w and b are updated after every mini-batch
+    (batch_size = 1 is stochastic gradient descent). Memory use depends on
+    chunksize and batch_size, not on the size of the file.
+
+    Regularization uses the total number of samples (lambda_ / m) so the model
+    minimizes the same cost as gradient_descent on the full dataset.
+
+    Inputs:
+        path: path to the csv file
+        target: name of the target column
+        w: model parameters
+        b: model parameter
+        lambda_: controls amount of regularization applied
+        alpha: learning rate
+        num_epochs: how many passes over the csv file
+        batch_size: number of samples in each batch
+        drop_columns: columns that aren't used as features
+        chunksize: number of rows read from the file at a time
+        normalize: zscore normalize the features with statistics from csv_feature_stats
+        seed: seed for shuffling the rows, rows aren't shuffled if None
+
+    Outputs:
+        w: updated values
+        b: updated value
+        cost_history: mean mini-batch cost of every epoch
+    """
+    mu, sigma, m = csv_feature_stats(path, target, drop_columns, chunksize)
+    if not normalize:
+        mu = sigma = None
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    cost_history = []
+    w_in = copy.deepcopy(w) # don't want to change the value
+    b_in = b
+    print_every = math.ceil(num_epochs / 10)
+
+    for epoch in range(num_epochs):
+        epoch_cost = 0.
+
+        for x_batch, y_batch in iter_minibatches(path, target, batch_size, drop_columns,
+                                                 chunksize, mu, sigma, rng):
+
+            # cost and gradient of the batch without regularization
+            cost, dj_dw, dj_db = compute_cost_and_gradient(x_batch, y_batch, w_in, b_in, 0.)
+            epoch_cost += cost * x_batch.shape[0]
+
+            # add regularization over the full dataset then update w and b
+            dj_dw += (lambda_ / m) * w_in
+            w_in = w_in - alpha * dj_dw
+            b_in = b_in - alpha * dj_db
+
+        cost_history.append(epoch_cost / m + (lambda_ / (2 * m)) * np.dot(w_in, w_in))
 
-        # print cost value every 100 iterations
-        if i % math.ceil(num_iters / 10) == 0:
-            print(f"Iteration {i:4d}: Cost {cost_history[-1]:8.2f}")
+        if epoch % print_every == 0:
+            print(f"Epoch {epoch:4d}: Cost {cost_history[-1]:8.2f}")
 
     return w_in, b_in, cost_history
 
 
+def ridge_cholesky(x: npt.NDArray,
+                   y: npt.NDArray,
+                   lambda_: float) -> tuple[npt.NDArray, float]:
+    """
+    Solves the same regularized cost that gradient_descent minimizes in closed form
+    using the normal equations:
+
+        (Xc^T * Xc + lambda_ * I) * w = Xc^T * yc,  b = mean(y) - mean(x) * w
+
+    where Xc and yc are x and y with their means removed (b isn't regularized).
+    The n x n system is solved with a cholesky factorization. This needs one pass
+    over x to build Xc^T * Xc, so it's best when there are few features.
+
+    Inputs:
+        x: training data
+        y: target values
+        lambda_: controls amount of regularization applied
+
+    Outputs:
+        w: model parameters
+        b: model parameter
+    """
+    n = x.shape[1]
+    x_mean = np.mean(x, axis=0)
+    y_mean = np.mean(y)
+    x_centered = x - x_mean
+
+    gram = x_centered.T @ x_centered
+    gram[np.diag_indices(n)] += lambda_
+    rhs = x_centered.T @ (y - y_mean)
+
+    try:
+        # gram = L * L^T, solve L * z = rhs then L^T * w = z
+        lower = np.linalg.cholesky(gram)
+        w = np.linalg.solve(lower.T, np.linalg.solve(lower, rhs))
+    except np.linalg.LinAlgError:
+        # gram is singular when lambda_ = 0 and features are collinear
+        w = np.linalg.lstsq(gram, rhs, rcond=None)[0]
+
+    b = float(y_mean - np.dot(x_mean, w))
+    return w, b
+
+
+def ridge_conjugate_gradient(x: npt.NDArray,
+                             y: npt.NDArray,
+                             lambda_: float,
+                             tol: float = 1e-10,
+                             max_iters: int | None = None) -> tuple[npt.NDArray, float]:
+    """
+    Solves the same system as ridge_cholesky with the conjugate gradient method.
+    Xc^T * Xc is never built, every iteration only needs the products x * v and
+    x^T * u, so this works for many features (and sparse x). In exact arithmetic it
+    converges in at most n iterations, but with rounding errors badly scaled features
+    (ex. unnormalized housing data) need many more, so it runs until the residual is
+    below tol and warns if max_iters runs out first.
+
+    Inputs:
+        x: training data
+        y: target values
+        lambda_: controls amount of regularization applied
+        tol: stop when the residual norm is below tol * norm(Xc^T * yc)
+        max_iters: maximum number of iterations (defaults to max(10 * n, 100))
+
+    Outputs:
+        w: model parameters
+        b: model parameter
+    """
+    n = x.shape[1]
+    x_mean = np.asarray(x.mean(axis=0)).ravel()
+    y_mean = np.mean(y)
+    y_centered = y - y_mean
+
+    def apply_operator(v: npt.NDArray) -> npt.NDArray:
+        # (Xc^T * Xc + lambda_ * I) * v without centering x
+        u = x @ v - np.dot(x_mean, v)
+        return x.T @ u - x_mean * np.sum(u) + lambda_ * v
+
+    rhs = x.T @ y_centered - x_mean * np.sum(y_centered)
+    w = np.zeros(n)
+    residual = rhs.copy()
+    direction = residual.copy()
+    rs_old = np.dot(residual, residual)
+    stop = (tol * np.linalg.norm(rhs))**2
+
+    if max_iters is None:
+        max_iters = max(10 * n, 100)
+
+    for _ in range(max_iters):
+        if rs_old <= stop:
+            break
+        a_direction = apply_operator(direction)
+        step = rs_old / np.dot(direction, a_direction)
+        w += step * direction
+        residual -= step * a_direction
+        rs_new = np.dot(residual, residual)
+        direction = residual + (rs_new / rs_old) * direction
+        rs_old = rs_new
+
+    if rs_old > stop:
+        warnings.warn(f"conjugate gradient didn't converge in {max_iters} iterations "
+                      f"(residual {np.sqrt(rs_old):.3g}, tolerance {np.sqrt(stop):.3g})", RuntimeWarning)
+
+    b = float(y_mean - np.dot(x_mean, w))
+    return w, b
+
+
+def ridge_solve(x: npt.NDArray,
+                y: npt.NDArray,
+                lambda_: float,
+                solver: str = 'auto',
+                max_cholesky_features: int = 2000) -> tuple[npt.NDArray, float]:
+    """
+    Fits w and b directly instead of with gradient descent. Returns the same (w, b)
+    as gradient_descent would after converging ('cg' warns if it stopped before
+    reaching its tolerance).
+
+    Solvers:
+        - 'cholesky': ridge_cholesky, O(m * n^2 + n^3)
+        - 'cg': ridge_conjugate_gradient, O(m * n) per iteration
+        - 'auto': cholesky when x is dense and n <= max_cholesky_features, otherwise cg
+
+    Inputs:
+        x: training data
+        y: target values
+        lambda_: controls amount of regularization applied
+        solver: which solver to use
+        max_cholesky_features: largest number of features 'auto' uses cholesky for
+
+    Outputs:
+        w: model parameters
+        b: model parameter
+    """
+    if solver == 'auto':
+        # centering sparse data for cholesky would make it dense
+        dense = not (sp.issparse(x) or isinstance(x, BlockDesign))
+        solver = 'cholesky' if dense and x.shape[1] <= max_cholesky_features else 'cg'
+
+    if solver == 'cholesky':
+        return ridge_cholesky(x, y, lambda_)
+    if solver == 'cg':
+        return ridge_conjugate_gradient(x, y, lambda_)
+    raise ValueError(f"solver must be 'auto', 'cholesky' or 'cg', not {solver!r}")
+
+
+class ZScoreScaler:
+    """
+    Reusable zscore normalization: z = (x - mu) / sigma.
+
+    Unlike zscore_normalization, the mean and standard deviation are kept after
+    fitting so the same statistics can normalize test / new data and turn normalized
+    predictions back into the original units (ex. dollars).
+
+    The statistics are updated incrementally (Welford / Chan et al. merge), so a
+    scaler can be fit chunk by chunk with partial_fit, and scalers fit in different
+    processes can be combined with merge.
+    """
+
+    def __init__(self):
+        """
+        Creates an empty (unfitted) scaler.
+        """
+        self.count: int = 0
+        self.mu: npt.NDArray | None = None
+        self.m2: npt.NDArray | None = None # sum of squared differences from the mean
+
+
+    @property
+    def sigma(self) -> npt.NDArray:
+        """
+        Standard deviation of every column. Columns with zero variance get a
+        standard deviation of 1 so they're only centered instead of divided by 0.
+        """
+        if self.count == 0:
+            raise ValueError("ZScoreScaler has not been fit")
+        sigma = np.sqrt(self.m2 / self.count)
+        return np.where(sigma > 0, sigma, 1.)
+
+
+    def partial_fit(self, x: npt.NDArray) -> 'ZScoreScaler':
+        """
+        Updates the statistics with another chunk of samples.
+
+        Input:
+            x: chunk of data, shape (m, n) or (m,)
+
+        Output: the scaler
+        """
+        chunk_count = x.shape[0]
+        if chunk_count == 0:
+            return self
+
+        # accumulate in float64 even if x is float32
+        chunk_mu = np.mean(x, axis=0, dtype=np.float64)
+        chunk_m2 = np.var(x, axis=0, dtype=np.float64) * chunk_count
+        return self._merge_stats(chunk_count, chunk_mu, chunk_m2)
+
+
+    def fit(self, x: npt.NDArray) -> 'ZScoreScaler':
+        """
+        Resets the scaler and computes the statistics of x.
+
+        Input:
+            x: training data, shape (m, n) or (m,)
+
+        Output: the scaler
+        """
+        self.count, self.mu, self.m2 = 0, None, None
+        return self.partial_fit(x)
+
+
+    def merge(self, other: 'ZScoreScaler') -> 'ZScoreScaler':
+        """
+        Combines the statistics of another scaler (ex. fit on a different chunk or in
+        another process) into this one.
+
+        Input:
+            other: scaler fit on other samples
+
+        Output: the scaler
+        """
+        if other.count == 0:
+            return self
+        return self._merge_stats(other.count, other.mu, other.m2)
+
+
+    def _merge_stats(self, count: int, mu: npt.NDArray, m2: npt.NDArray) -> 'ZScoreScaler':
+        if self.count == 0:
+            self.count, self.mu, self.m2 = count, np.array(mu, dtype=np.float64), np.array(m2, dtype=np.float64)
+            return self
+
+        total = self.count + count
+        delta = mu - self.mu
+        self.mu = self.mu + delta * (count / total)
+        self.m2 = self.m2 + m2 + delta**2 * (self.count * count / total)
+        self.count = total
+        return self
+
+
+    def transform(self, x: npt.NDArray, copy: bool = True) -> npt.NDArray:
+        """
+        Normalizes x with the fitted statistics.
+
+        With copy=False and a float x (ex. a big float32 matrix), x is normalized in
+        place and no new array is created.
+
+        Inputs:
+            x: data to normalize
+            copy: return a new array instead of changing x
+
+        Output: normalized x
+        """
+        mu, sigma = self.mu, self.sigma
+        if not copy and isinstance(x, np.ndarray) and np.issubdtype(x.dtype, np.floating):
+            x -= mu.astype(x.dtype)
+            x /= sigma.astype(x.dtype)
+            return x
+        return (x - mu) / sigma
+
+
+    def fit_transform(self, x: npt.NDArray, copy: bool = True) -> npt.NDArray:
+        """
+        Fits the scaler to x then normalizes x.
+
+        Inputs:
+            x: training data
+            copy: return a new array instead of changing x
+
+        Output: normalized x
+        """
+        return self.fit(x).transform(x, copy)
+
+
+    def inverse_transform(self, x_norm: npt.NDArray, copy: bool = True) -> npt.NDArray:
+        """
+        Converts normalized values back to the original units.
+
+        Inputs:
+            x_norm: normalized data (ex. predictions of y_normalized)
+            copy: return a new array instead of changing x_norm
+
+        Output: x_norm * sigma + mu
+        """
+        mu, sigma = self.mu, self.sigma
+        if not copy and isinstance(x_norm, np.ndarray) and np.issubdtype(x_norm.dtype, np.floating):
+            x_norm *= sigma.astype(x_norm.dtype)
+            x_norm += mu.astype(x_norm.dtype)
+            return x_norm
+        return x_norm * sigma + mu
+
+
+    def save(self, path: str) -> None:
+        """
+        Saves the statistics to a .npz file.
+
+        Input:
+            path: file path
+        """
+        if self.count == 0:
+            raise ValueError("ZScoreScaler has not been fit")
+        np.savez(path, count=self.count, mu=self.mu, m2=self.m2)
+
+
+    @classmethod
+    def load(cls, path: str) -> 'ZScoreScaler':
+        """
+        Loads a scaler saved with save.
+
+        Input:
+            path: file path
+
+        Output: the fitted scaler
+        """
+        scaler = cls()
+        with np.load(path) as data:
+            scaler.count = int(data['count'])
+            scaler.mu = data['mu']
+            scaler.m2 = data['m2']
+        return scaler
+
+
 def zscore_normalization(x: npt.NDArray) -> npt.NDArray:
     """
     Cleans the feature data to be within acceptable ranges so that gradient descent converges faster.
 
+    Use ZScoreScaler to keep the mean and standard deviation for other data.
+
     Input:
         x: training data
 
     Output:
         x: zscore normalized training data
     """
-    # find mean (mu) of each column/feature
-    mu = np.mean(x, axis=0)
+    return ZScoreScaler().fit_transform(x)
+
+
+def sigmoid(z: npt.NDArray) -> npt.NDArray:
+    """
+    Numerically stable sigmoid 1 / (1 + e^-z). exp is only ever called on
+    non-positive values so it can't overflow for large |z|.
+
+    Input:
+        z: values (ex. x * w + b)
+
+    Output: sigmoid of every value, between 0 and 1
+    """
+    z = np.asarray(z, dtype=np.float64)
+    exp_neg_abs = np.exp(-np.abs(z))
+    return np.where(z >= 0, 1 / (1 + exp_neg_abs), exp_neg_abs / (1 + exp_neg_abs))
+
+
+def compute_logistic_cost(x: npt.NDArray,
+                          y: npt.NDArray,
+                          w: npt.NDArray,
+                          b: float,
+                          lambda_: float) -> float:
+    """
+    Regularized log loss of logistic regression:
+        -mean(y * log(f) + (1 - y) * log(1 - f)) + (lambda_ / (2 * m)) * sum(w**2)
+    computed from z = x * w + b as mean(log(1 + e^z) - y * z) so log(0) never happens.
+
+    Inputs:
+        x: training data
+        y: target values (0 or 1)
+        w: model parameters
+        b: model parameter
+        lambda_: controls amount of regularization applied
+
+    Output: total cost with regularization over all samples
+    """
+    m = x.shape[0]
+    z = x @ w + b
+    cost = np.mean(np.logaddexp(0, z) - y * z)
+    return float(cost + (lambda_ / (2 * m)) * np.dot(w, w))
+
+
+def compute_logistic_gradient(x: npt.NDArray,
+                              y: npt.NDArray,
+                              w: npt.NDArray,
+                              b: float,
+                              lambda_: float) -> tuple[npt.NDArray, float]:
+    """
+    Gradient of compute_logistic_cost. Same form as linear regression with the
+    prediction passed through the sigmoid.
+
+    Inputs:
+        x: training data
+        y: target values (0 or 1)
+        w: model parameters
+        b: model parameter
+        lambda_: controls amount of regularization applied
+
+    Output: the derivative of w and b (dj_dw and dj_db) over all samples
+    """
+    m = x.shape[0]
+    err = sigmoid(x @ w + b) - y
+    dj_dw = (x.T @ err) / m + (lambda_ / m) * w
+    dj_db = float(np.sum(err)) / m
+    return dj_dw, dj_db
+
+
+def logistic_newton(x: npt.NDArray,
+                    y: npt.NDArray,
+                    lambda_: float,
+                    max_iters: int = 100,
+                    tol: float = 1e-8) -> tuple[npt.NDArray, float, int]:
+    """
+    Fits L2 regularized logistic regression with newton's method (iteratively
+    reweighted least squares). Every iteration solves an (n + 1) x (n + 1) system,
+    so it's best for few features, and usually converges in under 10 iterations.
+
+    Inputs:
+        x: training data (dense)
+        y: target values (0 or 1)
+        lambda_: controls amount of regularization applied (b isn't regularized)
+        max_iters: maximum number of newton steps
+        tol: stop when the largest parameter change is below tol
+
+    Outputs:
+        w: model parameters
+        b: model parameter
+        iterations: number of newton steps run
+    """
+    m, n = x.shape
+    x_aug = np.hstack((x, np.ones((m, 1))))
+    params = np.zeros(n + 1)
+    reg = np.full(n + 1, lambda_ / m)
+    reg[-1] = 0.
+
+    iterations = 0
+    for iterations in range(1, max_iters + 1):
+        f = sigmoid(x_aug @ params)
+        grad = x_aug.T @ (f - y) / m + reg * params
+
+        # hessian = X^T * S * X / m + lambda_ / m, S = f * (1 - f)
+        weights = f * (1 - f)
+        hessian = (x_aug.T * weights) @ x_aug / m
+        hessian[np.diag_indices(n + 1)] += reg + 1e-12
+        step = np.linalg.solve(hessian, grad)
+        params -= step
+
+        if np.max(np.abs(step)) < tol:
+            break
+
+    return params[:-1], float(params[-1]), iterations
+
+
+def logistic_minibatch(x: npt.NDArray,
+                       y: npt.NDArray,
+                       lambda_: float,
+                       alpha: float = 0.1,
+                       num_epochs: int = 100,
+                       batch_size: int = 256,
+                       tol: float = 1e-6,
+                       seed: int | None = 0) -> tuple[npt.NDArray, float, int]:
+    """
+    Fits L2 regularized logistic regression with mini-batch gradient descent. Each
+    update only touches batch_size rows, so this scales to many features and rows
+    (x can be sparse). Stops early when the cost over the data stops changing.
+
+    Inputs:
+        x: training data
+        y: target values (0 or 1)
+        lambda_: controls amount of regularization applied
+        alpha: learning rate
+        num_epochs: maximum number of passes over the data
+        batch_size: number of samples in each batch
+        tol: stop when the relative cost change between epochs is below tol
+        seed: seed for shuffling the rows every epoch
+
+    Outputs:
+        w: model parameters
+        b: model parameter
+        epochs: number of epochs run
+    """
+    m, n = x.shape
+    rng = np.random.default_rng(seed)
+    w = np.zeros(n)
+    b = 0.
+    prev_cost = None
+
+    epoch = 0
+    for epoch in range(1, num_epochs + 1):
+        order = rng.permutation(m)
+        for start in range(0, m, batch_size):
+            batch = order[start:start + batch_size]
+            x_batch = x[batch]
+            err = sigmoid(x_batch @ w + b) - y[batch]
+            # regularization is scaled by the full dataset size like the full cost
+            dj_dw = (x_batch.T @ err) / batch.shape[0] + (lambda_ / m) * w
+            w -= alpha * dj_dw
+            b -= alpha * float(np.mean(err))
+
+        cost = compute_logistic_cost(x, y, w, b, lambda_)
+        if prev_cost is not None and abs(prev_cost - cost) <= tol * max(prev_cost, np.finfo(float).tiny):
+            break
+        prev_cost = cost
+
+    return w, b, epoch
+
+
+class LogisticRegressionModel(ClassifierMixin, BaseEstimator):
+    """
+    Binary logistic regression built on the functions above with the same interface
+    as sklearn's LogisticRegression (fit, predict, predict_proba, decision_function,
+    coef_, intercept_), so it can be used in its place, including in sklearn
+    pipelines, clone and cross validation. get_params, set_params and score come
+    from the sklearn base classes.
+
+    lambda_reg is the regularization amount (lambda_ in the functions above, renamed
+    because sklearn treats attributes ending in _ as fitted). sklearn's C is about
+    1 / lambda_reg.
+    """
+
+    def __init__(self,
+                 lambda_reg: float = 1.0,
+                 solver: str = 'auto',
+                 max_iter: int = 100,
+                 alpha: float = 0.1,
+                 batch_size: int = 256,
+                 tol: float = 1e-8,
+                 max_newton_features: int = 1000,
+                 random_state: int | None = 0):
+        """
+        Inputs:
+            lambda_reg: controls amount of regularization applied
+            solver: 'newton', 'minibatch' or 'auto' (newton for up to max_newton_features)
+            max_iter: newton steps or mini-batch epochs
+            alpha: mini-batch learning rate
+            batch_size: mini-batch size
+            tol: stopping tolerance
+            max_newton_features: largest number of features 'auto' uses newton for
+            random_state: seed for the mini-batch shuffling
+        """
+        self.lambda_reg = lambda_reg
+        self.solver = solver
+        self.max_iter = max_iter
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.tol = tol
+        self.max_newton_features = max_newton_features
+        self.random_state = random_state
+
+
+    def fit(self, x: npt.NDArray, y: npt.NDArray) -> 'LogisticRegressionModel':
+        """
+        Trains the model.
+
+        Inputs:
+            x: training data
+            y: target values (two classes)
+
+        Output: the model
+        """
+        self.classes_ = np.unique(y)
+        if self.classes_.shape[0] != 2:
+            raise ValueError(f"LogisticRegressionModel needs two classes, got {self.classes_.shape[0]}")
+        y01 = (np.asarray(y) == self.classes_[1]).astype(np.float64)
+
+        solver = self.solver
+        dense = not (sp.issparse(x) or isinstance(x, BlockDesign))
+        if solver == 'auto':
+            solver = 'newton' if dense and x.shape[1] <= self.max_newton_features else 'minibatch'
+
+        if solver == 'newton' and not dense:
+            raise ValueError("solver='newton' needs a dense x, use 'minibatch' or 'auto' for "
+                             "sparse matrices and BlockDesign")
+        if solver == 'newton':
+            w, b, self.n_iter_ = logistic_newton(np.asarray(x, dtype=np.float64), y01,
+                                                 self.lambda_reg, self.max_iter, self.tol)
+        elif solver == 'minibatch':
+            w, b, self.n_iter_ = logistic_minibatch(x, y01, self.lambda_reg, self.alpha, self.max_iter,
+                                                    self.batch_size, self.tol, self.random_state)
+        else:
+            raise ValueError(f"solver must be 'auto', 'newton' or 'minibatch', not {solver!r}")
+
+        # same attribute shapes as sklearn, plus which solver 'auto' picked
+        self.solver_ = solver
+        self.coef_ = w.reshape(1, -1)
+        self.intercept_ = np.array([b])
+        self.n_features_in_ = x.shape[1]
+        return self
+
+
+    def decision_function(self, x: npt.NDArray) -> npt.NDArray:
+        """
+        Output: z = x * w + b for every sample
+        """
+        check_is_fitted(self)
+        return x @ self.coef_[0] + self.intercept_[0]
+
+
+    def predict_proba(self, x: npt.NDArray) -> npt.NDArray:
+        """
+        Output: probability of each class, shape (m, 2)
+        """
+        p = sigmoid(self.decision_function(x))
+        return np.column_stack((1 - p, p))
 
-    # find the standard deviation (sigma) of each column/feature
-    sigma = np.std(x, axis=0)
 
-    # calculate normalized x
-    x_norm = (x - mu) / sigma
+    def predict(self, x: npt.NDArray) -> npt.NDArray:
+        """
+        Output: predicted class of every sample (probability above 0.5)
+        """
+        z = self.decision_function(x)
+        return self.classes_[(z > 0).astype(int)]
 
-    return x_norm
\ No newline at end of file
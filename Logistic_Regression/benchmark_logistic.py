@@ -0,0 +1,112 @@
+"""
+Benchmarks the native numpy LogisticRegressionModel (Linear_Regression/tools.py)
+against sklearn's LogisticRegression on fit time and test accuracy.
+
+Both models get the same L2 regularization (lambda_reg = 1 / C) and are trained on
+the same zscore normalized training split. The datasets are the breast cancer
+dataset plus synthetic datasets that are large enough for the mini-batch solver
+to be used.
+
+Before timing, check_block_design makes sure a fit on a BlockDesign (dense features
+next to one hot encoded categories) gives the same model as a fit on the dense
+matrix it stands for.
+
+Run from the Logistic_Regression folder:
+    python benchmark_logistic.py
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import numpy.typing as npt
+from sklearn.datasets import load_breast_cancer, make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Linear_Regression'))
+from tools import BlockDesign, LogisticRegressionModel, one_hot_encode
+
+# (samples, features) of the synthetic datasets
+SYNTHETIC_SIZES = [(10000, 20), (50000, 200), (20000, 2000)]
+
+
+def benchmark_datasets() -> list[tuple[str, npt.NDArray, npt.NDArray]]:
+    """
+    Returns the (name, x, y) datasets used by the benchmark.
+    """
+    cancer = load_breast_cancer()
+    datasets = [('breast_cancer', cancer.data, cancer.target)]
+    for m, n in SYNTHETIC_SIZES:
+        x, y = make_classification(n_samples=m, n_features=n, n_informative=10, random_state=1)
+        datasets.append((f"synthetic_{m}x{n}", x, y))
+    return datasets
+
+
+def time_fit(model, x: npt.NDArray, y: npt.NDArray, repeats: int = 3) -> float:
+    """
+    Returns the best time (in seconds) of fitting model on x and y.
+
+    Inputs:
+        model: estimator to fit
+        x: training data
+        y: target values
+        repeats: how many times the model is fit
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.fit(x, y)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_block_design() -> None:
+    """
+    Fits the native model on a BlockDesign with solver 'auto' (which picks the
+    mini-batch solver for it) and on the equivalent dense matrix, and checks the
+    coefficients match.
+    """
+    rng = np.random.default_rng(1)
+    dense = rng.standard_normal((2000, 5))
+    codes = rng.integers(0, 4, 2000)
+    y = (dense[:, 0] + 0.5 * codes + rng.standard_normal(2000) > 1).astype(int)
+    one_hot = one_hot_encode(codes, 4)
+
+    block_model = LogisticRegressionModel(max_iter=20).fit(BlockDesign(dense, one_hot), y)
+    dense_model = LogisticRegressionModel(solver='minibatch', max_iter=20).fit(np.hstack((dense, one_hot.toarray())), y)
+    assert block_model.solver_ == 'minibatch'
+    np.testing.assert_allclose(block_model.coef_, dense_model.coef_, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(block_model.intercept_, dense_model.intercept_, rtol=1e-9, atol=1e-12)
+
+
+def run_benchmark(C: float = 1.0) -> None:
+    """
+    Fits both models on every dataset and prints the fit times and test accuracies.
+
+    Input:
+        C: inverse regularization strength of sklearn (the native model uses lambda_reg = 1 / C)
+    """
+    print(f"{'dataset':<24} | {'model':<28} | {'fit (ms)':>10} {'accuracy':>9} {'iters':>6}")
+    print("-" * 86)
+
+    for name, x, y in benchmark_datasets():
+        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.25, random_state=1, stratify=y)
+        scaler = StandardScaler().fit(x_train)
+        x_train, x_test = scaler.transform(x_train), scaler.transform(x_test)
+
+        native = LogisticRegressionModel(lambda_reg=1 / C, max_iter=100, random_state=1)
+        models = [('sklearn lbfgs', LogisticRegression(C=C, max_iter=1000, solver='lbfgs')),
+                  (f"native ({native.fit(x_train, y_train).solver_})", native)]
+
+        for label, model in models:
+            seconds = time_fit(model, x_train, y_train)
+            accuracy = model.score(x_test, y_test)
+            iters = int(np.max(model.n_iter_))
+            print(f"{name:<24} | {label:<28} | {seconds * 1e3:>10.2f} {accuracy:>9.4f} {iters:>6}")
+
+
+if __name__ == "__main__":
+    check_block_design()
+    run_benchmark()
@@ -0,0 +1,207 @@
+"""
+Compact artifact of the trained breast cancer classifier and a batch scorer for it.
+
+A ClassifierArtifact holds only the StandardScaler statistics, the logistic
+regression coefficients, the class labels and the feature names, saved as a small
+versioned .npz file. Scoring doesn't need the sklearn objects or the training data:
+the scaling is folded into the coefficients, so the probabilities of a chunk of
+rows are one matrix-vector product and a sigmoid.
+
+Example:
+    model.export_model('cancer_model.npz')      # BreastCancerClassificationModel
+
+    artifact = ClassifierArtifact.load('cancer_model.npz')
+    probabilities = artifact.predict_proba(x)
+    artifact.score_csv('new_patients.csv', 'scores.csv')
+
+Or from the command line:
+    python classifier_artifact.py cancer_model.npz new_patients.csv scores.csv
+"""
+
+import argparse
+from collections.abc import Sequence
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+ARTIFACT_VERSION = 1
+
+
+def sigmoid(z: npt.NDArray) -> npt.NDArray:
+    """
+    Numerically stable sigmoid, 1 / (1 + e^-z) = e^-log(1 + e^-z).
+    """
+    return np.exp(-np.logaddexp(0., -z))
+
+
+class ClassifierArtifact:
+    """
+    Trained binary classifier: probability of classes[1] = sigmoid(((x - mu) / sigma) * w + b).
+    """
+
+    __slots__ = ('w', 'b', 'mu', 'sigma', 'classes', 'feature_names')
+
+    def __init__(self,
+                 w: npt.NDArray,
+                 b: float,
+                 mu: npt.NDArray,
+                 sigma: npt.NDArray,
+                 classes: Sequence,
+                 feature_names: Sequence[str]):
+        """
+        Inputs:
+            w: trained coefficients (of the scaled features)
+            b: trained intercept
+            mu: mean of every training feature
+            sigma: standard deviation of every training feature
+            classes: the two class labels, the second one is the positive class
+            feature_names: names of the feature columns, in training order
+        """
+        self.w = np.asarray(w, dtype=np.float64).ravel()
+        self.b = float(b)
+        self.mu = np.asarray(mu, dtype=np.float64)
+        self.sigma = np.asarray(sigma, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.feature_names = list(feature_names)
+
+
+    @classmethod
+    def from_estimator(cls, scaler, model, feature_names: Sequence[str]) -> 'ClassifierArtifact':
+        """
+        Builds the artifact from a fitted StandardScaler and a fitted binary classifier
+        with coef_, intercept_ and classes_ (sklearn's LogisticRegression or the
+        LogisticRegressionModel in tools.py).
+
+        Inputs:
+            scaler: fitted StandardScaler
+            model: fitted classifier
+            feature_names: names of the feature columns
+
+        Output: the artifact
+        """
+        sigma = scaler.scale_ if scaler.scale_ is not None else np.ones_like(scaler.mean_)
+        return cls(model.coef_[0], model.intercept_[0], scaler.mean_, sigma, model.classes_, feature_names)
+
+
+    def _folded_parameters(self) -> tuple[npt.NDArray, float]:
+        """
+        Folds the scaling into the parameters so scoring works on the raw features:
+            z = x * (w / sigma) + b - mu * (w / sigma)
+        """
+        w_raw = self.w / self.sigma
+        return w_raw, self.b - np.dot(self.mu, w_raw)
+
+
+    def predict_proba(self, x: npt.NDArray) -> npt.NDArray:
+        """
+        Input:
+            x: raw (not scaled) features, shape (m, n)
+
+        Output: probability of each class, shape (m, 2)
+        """
+        w, b = self._folded_parameters()
+        p = sigmoid(x @ w + b)
+        return np.column_stack((1 - p, p))
+
+
+    def predict(self, x: npt.NDArray) -> npt.NDArray:
+        """
+        Input:
+            x: raw (not scaled) features, shape (m, n)
+
+        Output: predicted class of every row
+        """
+        w, b = self._folded_parameters()
+        return self.classes[(x @ w + b > 0).astype(int)]
+
+
+    def score_csv(self,
+                  csv_path: str,
+                  output_path: str,
+                  chunksize: int = 100000,
+                  id_column: str | None = None) -> int:
+        """
+        Scores a csv file chunk by chunk and writes the class probabilities and the
+        prediction of every row to output_path. Only one chunk is in memory at a
+        time, so the file can be any size. Rows with missing features get nan
+        probabilities and an empty prediction.
+
+        Inputs:
+            csv_path: csv with (at least) the feature_names columns
+            output_path: csv file the scores are written to
+            chunksize: number of rows scored at a time
+            id_column: column copied to the output to identify the rows (optional)
+
+        Output: number of rows scored
+        """
+        w, b = self._folded_parameters()
+        columns = self.feature_names + ([id_column] if id_column is not None else [])
+        rows = 0
+
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            for i, chunk in enumerate(pd.read_csv(csv_path, usecols=columns, chunksize=chunksize)):
+                x = chunk[self.feature_names].to_numpy(dtype=np.float64)
+                with np.errstate(invalid='ignore'): # rows with missing features are nan on purpose
+                    p = sigmoid(x @ w + b)
+
+                scores = pd.DataFrame(index=chunk.index)
+                if id_column is not None:
+                    scores[id_column] = chunk[id_column]
+                scores[f"proba_{self.classes[0]}"] = 1 - p
+                scores[f"proba_{self.classes[1]}"] = p
+                prediction = np.where(p > 0.5, self.classes[1], self.classes[0]).astype(object)
+                prediction[np.isnan(p)] = None # written as an empty field, not a guessed class
+                scores['prediction'] = prediction
+                scores.to_csv(f, header=(i == 0), index=False)
+                rows += len(chunk)
+        return rows
+
+
+    def save(self, path: str) -> None:
+        """
+        Saves the artifact to a small binary .npz file.
+
+        Input:
+            path: file path
+        """
+        np.savez(path,
+                 version=np.array(ARTIFACT_VERSION),
+                 w=self.w,
+                 b=np.array(self.b),
+                 mu=self.mu,
+                 sigma=self.sigma,
+                 classes=self.classes,
+                 feature_names=np.array(self.feature_names, dtype=np.str_))
+
+
+    @classmethod
+    def load(cls, path: str) -> 'ClassifierArtifact':
+        """
+        Loads an artifact saved with save.
+
+        Input:
+            path: file path
+
+        Output: the artifact
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != ARTIFACT_VERSION:
+                raise ValueError(f"{path} has artifact version {int(data['version'])}, "
+                                 f"expected {ARTIFACT_VERSION}")
+            return cls(data['w'], float(data['b']), data['mu'], data['sigma'],
+                       data['classes'], data['feature_names'].tolist())
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Score a csv of feature rows with an exported classifier')
+    parser.add_argument('artifact', help='.npz file written by export_model')
+    parser.add_argument('csv', help='csv with the feature columns')
+    parser.add_argument('output', help='csv file the scores are written to')
+    parser.add_argument('--chunksize', type=int, default=100000, help='rows scored at a time')
+    parser.add_argument('--id-column', help='column copied to the output to identify the rows')
+    args = parser.parse_args()
+
+    artifact = ClassifierArtifact.load(args.artifact)
+    num_rows = artifact.score_csv(args.csv, args.output, args.chunksize, args.id_column)
+    print(f"Scored {num_rows} rows into {args.output}")
@@ -0,0 +1,132 @@
+"""
+Dataset profile of a classification dataset: feature to target correlations, the
+correlation matrix of the features and the class counts, computed once from the
+numpy arrays.
+
+Every statistic comes from one standardized copy of the features:
+    correlation to the target = xs.T @ ys / m
+    correlation matrix        = xs.T @ xs / m
+so there's no dataframe to build and no pairwise loop. The top features are picked
+with np.argpartition (O(n)) and only those k are sorted.
+
+BreastCancerClassificationModel runs it as its 'profile' stage, so it's cached by
+the dataset's fingerprint and every plot and report reads from the same profile.
+
+Example:
+    profile = DatasetProfile.from_arrays(data.data, data.target, data.feature_names)
+    profile.top_features(10)
+    profile.strongest_features_corr(10)
+"""
+
+from collections.abc import Sequence
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+
+def _standardize(x: npt.NDArray) -> npt.NDArray:
+    """
+    Zscore normalizes every column. Constant columns become nan, like pandas' corr.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    std = x.std(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (x - x.mean(axis=0)) / np.where(std > 0, std, np.nan)
+
+
+def top_k_indices(values: npt.NDArray, k: int) -> npt.NDArray:
+    """
+    Indices of the k largest values, largest first (nan values come last).
+
+    Inputs:
+        values: 1d array
+        k: number of indices
+
+    Output: array of k indices
+    """
+    values = np.where(np.isnan(values), -np.inf, values)
+    k = min(k, values.shape[0])
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    top = np.argpartition(-values, k - 1)[:k]
+    return top[np.argsort(-values[top], kind='stable')]
+
+
+class DatasetProfile:
+    """
+    Correlations and class counts of a dataset, see the module docstring.
+    """
+
+    __slots__ = ('feature_names', 'target_corr', 'corr_matrix', 'class_counts', 'num_samples')
+
+    def __init__(self,
+                 feature_names: Sequence[str],
+                 target_corr: npt.NDArray,
+                 corr_matrix: npt.NDArray,
+                 class_counts: pd.Series,
+                 num_samples: int):
+        """
+        Inputs:
+            feature_names: names of the features
+            target_corr: correlation of every feature to the target, shape (n,)
+            corr_matrix: correlation matrix of the features, shape (n, n)
+            class_counts: number of samples of every class
+            num_samples: number of samples
+        """
+        self.feature_names = list(feature_names)
+        self.target_corr = target_corr
+        self.corr_matrix = corr_matrix
+        self.class_counts = class_counts
+        self.num_samples = num_samples
+
+
+    @classmethod
+    def from_arrays(cls, x: npt.NDArray, y: npt.NDArray, feature_names: Sequence[str]) -> 'DatasetProfile':
+        """
+        Computes the profile of a dataset.
+
+        Inputs:
+            x: features, shape (m, n)
+            y: class of every sample
+            feature_names: names of the n features
+
+        Output: the profile
+        """
+        m = x.shape[0]
+        xs = _standardize(x)
+        ys = _standardize(np.asarray(y, dtype=np.float64).reshape(-1, 1))[:, 0]
+
+        classes, counts = np.unique(y, return_counts=True)
+        return cls(feature_names,
+                   target_corr=(xs.T @ ys) / m,
+                   corr_matrix=(xs.T @ xs) / m,
+                   class_counts=pd.Series(counts, index=classes, name='count'),
+                   num_samples=m)
+
+
+    def top_features(self, n: int = 10) -> pd.Series:
+        """
+        Absolute correlation to the target of the n most correlated features.
+
+        Input:
+            n: number of features
+
+        Output: series of correlation values indexed by feature name
+        """
+        abs_corr = np.abs(self.target_corr)
+        top = top_k_indices(abs_corr, n)
+        return pd.Series(abs_corr[top], index=[self.feature_names[i] for i in top])
+
+
+    def strongest_features_corr(self, n: int = 10) -> pd.DataFrame:
+        """
+        Correlation matrix of the n features most correlated to the target.
+
+        Input:
+            n: number of features
+
+        Output: n x n correlation matrix
+        """
+        top = top_k_indices(np.abs(self.target_corr), n)
+        names = [self.feature_names[i] for i in top]
+        return pd.DataFrame(self.corr_matrix[np.ix_(top, top)], index=names, columns=names)
@@ -1,27 +1,261 @@
 """
 Logistic Regression will be used on Wisconsin breast cancer dataset
 from sklearn. 
+
+The model runs as a pipeline of stages: profile -> split -> scale -> fit -> evaluate.
+Every stage is memoized by a hash of its parameters, the hashes of the stages it
+depends on, the source of the modules that compute the stages and the numpy /
+sklearn versions. Results are kept in memory (per model) and on disk (cache_dir),
+so calling a function twice or rerunning the script skips stages that already ran,
+while editing the code or upgrading a library reruns them.
 """
 
+# standard library imports
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import sys
+import time
+
 # third party imports
+import joblib
 import numpy as np
+import numpy.typing as npt
+import matplotlib
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
+import sklearn
 from sklearn.datasets import load_breast_cancer
+from scipy import stats
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score,
-    recall_score,
-    f1_score,
-    roc_curve,
-    roc_auc_score,
-    confusion_matrix)
+from sklearn.model_selection import RepeatedStratifiedKFold, cross_validate, train_test_split
+from sklearn.metrics import confusion_matrix
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
+from sklearn.base import clone
 from sklearn.utils import Bunch
 
+# local imports (the native logistic regression engine lives in Linear_Regression/tools.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Linear_Regression'))
+import tools
+from tools import LogisticRegressionModel
+import model_search
+from model_search import DEFAULT_CS, DEFAULT_SOLVERS, successive_halving_search
+from classifier_artifact import ClassifierArtifact
+import dataset_profile
+from dataset_profile import DatasetProfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pipeline_cache')
+
+
+def source_fingerprint(paths: list[str]) -> str:
+    """
+    Hashes the contents of source files.
+
+    Input:
+        paths: paths to the files
+
+    Output: sha256 hex digest
+    """
+    sha = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+# code and library versions the stage results depend on, part of every stage key
+STAGE_VERSION = {'source': source_fingerprint([__file__, tools.__file__, model_search.__file__,
+                                               dataset_profile.__file__]),
+                 'numpy': np.__version__,
+                 'sklearn': sklearn.__version__}
+
+
+def dataset_fingerprint(data: Bunch) -> str:
+    """
+    Hashes the dataset's values, targets and feature names.
+
+    Input:
+        data: a Bunch object containing the dataset
+
+    Output: sha256 hex digest
+    """
+    sha = hashlib.sha256()
+    for array in (np.ascontiguousarray(data.data), np.ascontiguousarray(data.target)):
+        sha.update(str((array.shape, array.dtype.str)).encode())
+        sha.update(array.tobytes())
+    sha.update('\n'.join(data.feature_names).encode())
+    return sha.hexdigest()
+
+
+def binary_metrics(cm: npt.NDArray) -> dict:
+    """
+    Computes every evaluation metric from one 2x2 confusion matrix instead of going
+    over the predictions once per metric. Matches the sklearn metric functions
+    (a metric with a zero denominator is 0). The roc curve of hard 0/1 predictions
+    only has the points (0, 0), (fpr, tpr) and (1, 1).
+
+    Input:
+        cm: confusion matrix [[tn, fp], [fn, tp]]
+
+    Output: dictionary of accuracy, precision, recall, f1, confusion_matrix, fpr, tpr, roc_auc
+    """
+    tn, fp, fn, tp = (float(value) for value in cm.ravel())
+
+    def ratio(numerator: float, denominator: float) -> float:
+        return numerator / denominator if denominator else 0.
+
+    precision = ratio(tp, tp + fp)
+    recall = ratio(tp, tp + fn)
+    fpr = ratio(fp, fp + tn)
+    return {'accuracy': ratio(tp + tn, tp + tn + fp + fn),
+            'precision': precision,
+            'recall': recall,
+            'f1': ratio(2 * tp, 2 * tp + fp + fn),
+            'confusion_matrix': cm,
+            'fpr': np.array([0., fpr, 1.]),
+            'tpr': np.array([0., recall, 1.]),
+            'roc_auc': (1 + recall - fpr) / 2}
+
+
+def _use_headless_backend() -> None:
+    """
+    Worker initializer: draw with the non-interactive Agg backend.
+    """
+    matplotlib.use('Agg')
+
+
+def _finish_figure(path: str | None) -> None:
+    """
+    Shows the current figure, or saves it to path and closes it.
+    """
+    if path is None:
+        plt.show()
+    else:
+        plt.savefig(path, dpi=100)
+        plt.close()
+
+
+def plot_class_distribution(class_counts: pd.Series, path: str | None = None) -> None:
+    """
+    Bar graph of the number of samples in each class.
+
+    Input:
+        class_counts: number of samples of every class
+        path: save the figure to this file instead of showing it
+    """
+    sns.set_theme(style="whitegrid", palette="pastel")
+    _, ax = plt.subplots(figsize=(8, 6))
+
+    # create a bar plot to show the distribution between 0 and 1 targets
+    ax = sns.barplot(x=class_counts.index.astype(str), y=class_counts.to_numpy(), hue=class_counts.index.astype(str),
+                     legend=False, ax=ax)
+
+    # customize plot
+    ax.set_title("Class Distribution", fontsize=14, fontweight="bold")
+    ax.set_ylabel(ylabel="Count", fontsize=12, fontweight="bold")
+    ax.set_xlabel(xlabel="Class", fontsize=12, fontweight="bold")
+    ax.tick_params(axis='both', labelsize=10)
+
+    # add counts above the bars
+    for p in ax.patches:
+        ax.annotate(text=f"{p.get_height():.0f}",
+                    xy=(p.get_x() + p.get_width() / 2., p.get_height()),
+                    xytext=(0, 10),
+                    ha='center',
+                    va='center',
+                    fontsize=10,
+                    color='black',
+                    textcoords='offset points')
+
+    plt.tight_layout()
+    _finish_figure(path)
+
+
+def plot_correlation_matrix(corr_matrix: pd.DataFrame, path: str | None = None) -> None:
+    """
+    Heatmap of the correlation matrix of the strongest features.
+
+    Input:
+        corr_matrix: correlation matrix
+        path: save the figure to this file instead of showing it
+    """
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap="coolwarm", linewidths=0.5)
+    plt.title(f"Correlation Matrix with {len(corr_matrix)} strongest features to the target",
+              fontsize=20,
+              fontweight='bold')
+    plt.xticks(fontsize=10, rotation=45)
+    plt.yticks(fontsize=10)
+    _finish_figure(path)
+
+
+def plot_confusion_matrix(cm: npt.NDArray, path: str | None = None) -> None:
+    """
+    Heatmap of the confusion matrix.
+
+    Input:
+        cm: confusion matrix
+        path: save the figure to this file instead of showing it
+    """
+    plt.figure(figsize=(10, 8))
+    sns.set_theme(style="ticks")
+    sns.heatmap(data=cm,
+                annot=True,
+                fmt='g',
+                cmap=sns.color_palette(['#F01E2C', '#3BB143']))
+    plt.xlabel('Predicted', fontsize=12)
+    plt.ylabel('True', fontsize=12)
+    plt.title(label='Confusion Matrix', fontsize='16', fontweight='bold')
+    plt.tick_params(axis='both', which='both', length=0)
+    _finish_figure(path)
+
+
+def plot_roc_curve(fpr: npt.NDArray, tpr: npt.NDArray, roc_auc: float, path: str | None = None) -> None:
+    """
+    Plots the roc curve.
+
+    Input:
+        fpr: false positive rates
+        tpr: true positive rates
+        roc_auc: area under the curve
+        path: save the figure to this file instead of showing it
+    """
+    plt.figure(figsize=(8, 6))
+    plt.plot(fpr, tpr, color='blue', label='ROC Curve (AUC = %0.2f)' % roc_auc)
+    plt.plot([0, 1], [0, 1], color='black', linestyle='--')
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title('Receiver Operating Characteristic (ROC) Curve', fontsize=16, fontweight='bold')
+    plt.legend(loc='lower right')
+    plt.xlim([0, 1])
+    plt.ylim([0, 1])
+    plt.grid(linestyle='--', alpha=0.8)
+    _finish_figure(path)
+
+
+def plot_top_features(top_n_features: pd.Series, n: int, path: str | None = None) -> None:
+    """
+    Horizontal bar graph of how strongly the top n features correlate to the target.
+
+    Input:
+        top_n_features: correlation values indexed by feature name
+        n: number of features
+        path: save the figure to this file instead of showing it
+    """
+    bar_colors = ['red' if val < 0 else 'green' for val in top_n_features.values]
+    plt.figure(figsize=(10, 8))
+    plt.barh(y=top_n_features.index, width=top_n_features.values, color=bar_colors)
+    plt.xlabel('Correlation value to Target')
+    plt.ylabel('Features')
+    plt.title(f"Top {n} Features' Correlation to Target", fontsize=16, fontweight='bold')
+    plt.xticks(fontsize=12)
+    plt.yticks(fontsize=12)
+    _finish_figure(path)
+
 
 class BreastCancerClassificationModel:
     """
@@ -29,7 +263,11 @@ class BreastCancerClassificationModel:
     dataset from sklearn. Also it performs an analysis on how well the model.
     """
 
-    def __init__(self, data: Bunch, max_iters: int = 200):
+    def __init__(self,
+                 data: Bunch,
+                 max_iters: int = 200,
+                 cache_dir: str | None = DEFAULT_CACHE_DIR,
+                 engine: str = 'sklearn'):
         """
         Initialize the data and target into a pandas dataframe.
         Also split the dataframe into training and testing sets.
@@ -37,81 +275,185 @@ class BreastCancerClassificationModel:
         Input:
             data: a Bunch object containing the breast cancer dataset
             max_iters: number of iterations for the class to converge on optimal result
+            cache_dir: folder where stage results are saved (None to only cache in memory)
+            engine: 'sklearn' for sklearn's LogisticRegression or 'native' for the numpy
+                    LogisticRegressionModel in tools.py (same regularization as C=1)
         """
 
-        # create dataframe
         self.data = data
-        self.data_df = pd.DataFrame(data=np.c_[data.data, data.target],
-                                    columns=list(data.feature_names) + ['target'])
+        self.cache_dir = cache_dir
+        self.engine = engine
+        self.stage_keys: dict[str, str] = {}
+        # results of the stages this model ran or loaded, and whether they came from a cache
+        self.stage_results: dict = {}
+        self.stage_cached: dict[str, bool] = {}
+
+        # correlations and class counts, computed once per dataset
+        self.profile: DatasetProfile = self._run_stage('profile', {'data': dataset_fingerprint(data)},
+                                                       [], self._profile_stage)
 
         # split data into test and training set
-        self.x_train, self.x_test, self.y_train, self.y_test = train_test_split(
-            data.data, data.target, test_size=0.25, random_state=1)
+        self.x_train, self.x_test, self.y_train, self.y_test = self._run_stage(
+            'split', {'test_size': 0.25, 'random_state': 1}, ['profile'], self._split_stage)
 
         # create scaler and classifier
+        self.max_iters = max_iters
         self.scaler = StandardScaler()
-        self.model = LogisticRegression(random_state=1, max_iter=max_iters, solver='lbfgs')
+        if engine == 'sklearn':
+            self.model = LogisticRegression(random_state=1, max_iter=max_iters, solver='lbfgs')
+        elif engine == 'native':
+            self.model = LogisticRegressionModel(lambda_reg=1.0, max_iter=max_iters, random_state=1)
+        else:
+            raise ValueError(f"engine must be 'sklearn' or 'native', not {engine!r}")
 
         # dataframe that'll contain evaluation metrics from this model
         self.evaluation_metrics: pd.DataFrame
 
 
-    def visualize_data(self) -> None:
+    def _run_stage(self, name: str, params: dict, depends: list[str], stage):
         """
-        This function will create a bar graph that shows the data distribution.
+        Runs a pipeline stage or returns its memoized result.
+
+        The stage's key is a hash of its name, params, the keys of the stages it
+        depends on and STAGE_VERSION, so a stage reruns only when something upstream,
+        the code or a library changed. Results are looked up in this model's memory
+        first, then in cache_dir. self.stage_cached[name] records whether the result
+        was reused instead of computed by this call (so its timings are old).
+
+        Input:
+            name: stage name
+            params: parameters that change the stage's result
+            depends: names of the stages whose results this stage uses
+            stage: function that computes the result
+
+        Output: the stage's result
         """
+        description = json.dumps({'stage': name,
+                                  'params': params,
+                                  'depends': [self.stage_keys[dep] for dep in depends],
+                                  'version': STAGE_VERSION},
+                                 sort_keys=True, default=str)
+        key = hashlib.sha256(description.encode()).hexdigest()
+        self.stage_keys[name] = key
+
+        if key in self.stage_results:
+            self.stage_cached[name] = True
+            return self.stage_results[key]
+
+        path = os.path.join(self.cache_dir, f"{name}-{key[:16]}.joblib") if self.cache_dir else None
+        if path is not None and os.path.exists(path):
+            result = joblib.load(path)
+            self.stage_cached[name] = True
+        else:
+            result = stage()
+            self.stage_cached[name] = False
+            if path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                joblib.dump(result, path)
+
+        self.stage_results[key] = result
+        return result
+
+
+    @property
+    def data_df(self) -> pd.DataFrame:
+        """
+        Dataframe of the features and target, only built when it's asked for (the
+        plots and reports use self.profile).
+        """
+        data_df = pd.DataFrame(data=self.data.data, columns=list(self.data.feature_names))
+        data_df['target'] = self.data.target
+        return data_df
+
 
-        sns.set_theme(style="whitegrid", palette="pastel")
-        _, ax = plt.subplots(figsize=(8, 6))
+    def _profile_stage(self) -> DatasetProfile:
+        """
+        Stage 'profile': feature correlations and class counts of the whole dataset.
+        """
+        return DatasetProfile.from_arrays(self.data.data, self.data.target, self.data.feature_names)
 
-        # create a count plot to show the distribution between 0 and 1 targets
-        ax = sns.countplot(data=self.data_df, x='target')
 
-        # customize plot
-        ax.set_title("Class Distribution", fontsize=14, fontweight="bold")
-        ax.set_ylabel(ylabel="Count", fontsize=12, fontweight="bold")
-        ax.set_xlabel(xlabel="Class", fontsize=12, fontweight="bold")
-        ax.tick_params(axis='both', labelsize=10)
+    def _split_stage(self) -> tuple:
+        """
+        Stage 'split': x_train, x_test, y_train, y_test (not scaled).
+        """
+        return train_test_split(self.data.data, self.data.target, test_size=0.25, random_state=1)
 
-        # add counts above the bars
-        for p in ax.patches:
-            ax.annotate(text=f"{p.get_height():.0f}",
-                        xy=(p.get_x() + p.get_width() / 2., p.get_height()),
-                        xytext=(0, 10),
-                        ha='center',
-                        va='center',
-                        fontsize=10,
-                        color='black',
-                        textcoords='offset points')
 
-        plt.tight_layout()
-        plt.show()
+    def _scale_stage(self) -> tuple:
+        """
+        Stage 'scale': the scaler fit on the unscaled training set, plus the scaled
+        training and test sets. Always starts from the split stage's unscaled data.
+        """
+        x_train, x_test, _, _ = self.stage_results[self.stage_keys['split']]
+        scaler = clone(self.scaler)
+        return scaler, scaler.fit_transform(x_train), scaler.transform(x_test)
 
 
-    def feature_correlation(self) -> None:
+    def _fit_stage(self) -> LogisticRegression:
+        """
+        Stage 'fit': a copy of self.model trained on the scaled training set.
+        """
+        _, x_train, _ = self.stage_results[self.stage_keys['scale']]
+        _, _, y_train, _ = self.stage_results[self.stage_keys['split']]
+        return clone(self.model).fit(x_train, y_train)
+
+
+    def _evaluate_stage(self) -> dict:
+        """
+        Stage 'evaluate': predictions and metrics of the trained model on the test set.
+        """
+        model = self.stage_results[self.stage_keys['fit']]
+        _, _, x_test = self.stage_results[self.stage_keys['scale']]
+        _, _, _, y_test = self.stage_results[self.stage_keys['split']]
+
+        y_pred = model.predict(x_test)
+        return {'y_pred': y_pred, **binary_metrics(confusion_matrix(y_test, y_pred, labels=[0, 1]))}
+
+
+    def visualize_data(self, path: str | None = None) -> None:
+        """
+        This function will create a bar graph that shows the data distribution.
+
+        Input:
+            path: save the figure to this file instead of showing it
+        """
+        plot_class_distribution(self.profile.class_counts, path)
+
+
+    def feature_correlation(self, path: str | None = None) -> None:
         """
         Finds 10 features that are closely correlated to the target.
         Then creates a correlation matrix to show it.
+
+        Input:
+            path: save the figure to this file instead of showing it
+        """
+        plot_correlation_matrix(self.strongest_features_corr(10), path)
+
+
+    def strongest_features_corr(self, n: int = 10) -> pd.DataFrame:
         """
+        Correlation matrix of the n features most correlated to the target.
 
-        # find strongest feature correlations
-        feature_correlation = self.data_df.corrwith(self.data_df['target']).abs().sort_values(ascending=False)
+        Input:
+            n: number of features
 
-        # get only top 10 features
-        strongest_features = feature_correlation.iloc[1:11].index.values
+        Output: n x n correlation matrix
+        """
+        return self.profile.strongest_features_corr(n)
 
-        # create the correlation matrix with the top features
-        corr_matrix = self.data_df[strongest_features].corr()
 
-        # create correlation matrix plot
-        plt.figure(figsize=(12, 8))
-        sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap="coolwarm", linewidths=0.5)
-        plt.title("Correlation Matrix with 10 strongest features to the target",
-                  fontsize=20,
-                  fontweight='bold')
-        plt.xticks(fontsize=10, rotation=45)
-        plt.yticks(fontsize=10)
-        plt.show()
+    def top_features(self, n: int = 10) -> pd.Series:
+        """
+        Absolute correlation to the target of the n most correlated features.
+
+        Input:
+            n: number of features
+
+        Output: series of correlation values indexed by feature name
+        """
+        return self.profile.top_features(n)
 
 
     def preprocess_data(self) -> None:
@@ -120,19 +462,111 @@ class BreastCancerClassificationModel:
 
         Don't need to fit and transform the test set because the scaler
         has already found the weights from the training set.
+
+        The scaler is always fit on the unscaled split, so calling this more than once
+        doesn't scale the data twice.
         """
-        self.x_train = self.scaler.fit_transform(self.x_train)
-        self.x_test = self.scaler.transform(self.x_test)
+        self.scaler, self.x_train, self.x_test = self._run_stage(
+            'scale', {'scaler': self.scaler.get_params()}, ['split'], self._scale_stage)
 
 
     def train_model(self) -> None:
         """
         Train the data using the LogisticRegression() model.
         """
-        self.model.fit(self.x_train, self.y_train)
+        self.preprocess_data()
+        self.model = self._run_stage('fit', {'model': type(self.model).__name__,
+                                             'params': self.model.get_params()},
+                                     ['scale'], self._fit_stage)
+
+
+    def export_model(self, path: str | None = None) -> str:
+        """
+        Saves the trained scaler statistics and model coefficients to a small .npz
+        artifact (see classifier_artifact.py) that can score new data without sklearn
+        objects or the training data. Trains the model first if it hasn't been.
+
+        Input:
+            path: file path (defaults to cancer_model.npz in this folder)
+
+        Output: path of the artifact
+        """
+        if path is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cancer_model.npz')
+
+        self.train_model()
+        ClassifierArtifact.from_estimator(self.scaler, self.model, self.data.feature_names).save(path)
+        return path
+
+
+    def search_model(self,
+                     Cs: tuple[float, ...] = DEFAULT_CS,
+                     solvers: tuple[str, ...] = DEFAULT_SOLVERS,
+                     eta: int = 3,
+                     n_splits: int = 5,
+                     n_repeats: int = 3,
+                     n_jobs: int = -1) -> dict:
+        """
+        Searches for the best regularization strength C and solver with successive
+        halving (see model_search.py) on the training set, then replaces self.model
+        with a model of the same engine using them. Call train_model afterwards to fit
+        it. The test set isn't used, so it stays held out for evaluate_model.
+
+        The candidates are always scored with sklearn's solvers. With engine='native'
+        only the best C is used (as lambda_reg = 1 / C, the same objective), since the
+        native model has its own solvers.
+
+        The fits are saved in self.search_fits.
+
+        Input:
+            Cs: inverse regularization strengths to try
+            solvers: LogisticRegression solvers to try
+            eta: only the best 1 / eta of the candidates survive each round
+            n_splits: number of folds
+            n_repeats: number of times the folds are reshuffled
+            n_jobs: number of parallel jobs (-1 for all cores)
+
+        Output: summary of the search (best solver, C and score, rounds, number of fits,
+                seconds, and 'cached' if the result was reused from an earlier run)
+        """
+        params = {'Cs': [float(C) for C in Cs],
+                  'solvers': list(solvers),
+                  'eta': eta,
+                  'n_splits': n_splits,
+                  'n_repeats': n_repeats,
+                  'max_iter': self.max_iters}
+        self.search_fits, summary = self._run_stage(
+            'search', params, ['split'],
+            lambda: self._search_stage(Cs, solvers, eta, n_splits, n_repeats, n_jobs))
+        # 'seconds' was measured when the search ran, which may have been an earlier run
+        summary = {**summary, 'cached': self.stage_cached['search']}
+
+        if self.engine == 'native':
+            self.model = LogisticRegressionModel(lambda_reg=1 / summary['best_C'], max_iter=self.max_iters,
+                                                 random_state=1)
+        else:
+            self.model = LogisticRegression(random_state=1, max_iter=self.max_iters,
+                                            solver=summary['best_solver'], C=summary['best_C'])
+        return summary
+
+
+    def _search_stage(self,
+                      Cs: tuple[float, ...],
+                      solvers: tuple[str, ...],
+                      eta: int,
+                      n_splits: int,
+                      n_repeats: int,
+                      n_jobs: int) -> tuple[pd.DataFrame, dict]:
+        """
+        Stage 'search': successive halving search on the unscaled training set.
+        """
+        x_train, _, y_train, _ = self.stage_results[self.stage_keys['split']]
+        return successive_halving_search(x_train, y_train, Cs, solvers, eta,
+                                         n_splits=n_splits, n_repeats=n_repeats,
+                                         max_iter=self.max_iters, n_jobs=n_jobs, random_state=1)
 
 
-    def evaluate_model(self, n: int = 10) -> None:
+    def evaluate_model(self, n: int = 10, output_dir: str | None = None) -> None:
         """
         This function evaluates the performance of the model using several different metrics such as:
             - accuracy
@@ -141,92 +575,175 @@ class BreastCancerClassificationModel:
             - confusion matrix
             - ROC AUC score and curve
 
-        The confusion matrix and roc curve will be shown. The other metrics will be printed
-        to the console.
+        The confusion matrix and roc curve will be shown (or saved to output_dir).
+        The other metrics are saved in self.evaluation_metrics.
+
+        All metrics come from one set of predictions and one confusion matrix.
 
         Note: Model evaluation will be done on the testing data.
 
         Input:
             n: number of features used to evaluate the model
+            output_dir: save the figures to this folder instead of showing them
         """
+        results = self._evaluation_results()
+        figures = self._evaluation_figures(results, n, output_dir)
+        for plot_function, args, path in figures:
+            plot_function(*args, path)
 
-        # preprocess the data
-        self.preprocess_data()
 
-        # train the model
-        self.train_model()
+    def _evaluation_results(self) -> dict:
+        """
+        Trains the model if needed and sets self.evaluation_metrics from the
+        'evaluate' stage.
 
-        # get y_predictions to use for the evaluation metrics
-        y_pred = self.model.predict(self.x_test)
+        Output: the 'evaluate' stage's results
+        """
+        # preprocess the data and train the model (skipped if they already ran)
+        self.train_model()
 
-        accuracy: float = accuracy_score(self.y_test, y_pred)
-        precision: float = precision_score(self.y_test, y_pred)
-        recall: float = recall_score(self.y_test, y_pred)
-        f1: float = f1_score(self.y_test, y_pred)
+        # predictions and evaluation metrics
+        results = self._run_stage('evaluate', {}, ['fit'], self._evaluate_stage)
 
         # get confusion matrix values: true negative, false positive, false negative, true positive
-        tn, fp, fn, tp = confusion_matrix(self.y_test, y_pred).ravel()
-
-        # plot confusion matrix
-        plt.figure(figsize=(10, 8))
-        sns.set_theme(style="ticks")
-        sns.heatmap(data=confusion_matrix(y_true=self.y_test, y_pred=y_pred),
-                    annot=True,
-                    fmt='g',
-                    cmap=sns.color_palette(['#F01E2C', '#3BB143']))
-        plt.xlabel('Predicted', fontsize=12)
-        plt.ylabel('True', fontsize=12)
-        plt.title(label='Confusion Matrix', fontsize='16', fontweight='bold')
-        plt.tick_params(axis='both', which='both', length=0)
-        plt.show()
-
-        # get fpr and tpr from roc curve and get roc_auc_score
-        fpr, tpr, _ = roc_curve(y_true=self.y_test, y_score=y_pred)
-        roc_auc = roc_auc_score(y_true=self.y_test, y_score=y_pred)
-
-        # plot the roc curve
-        plt.figure(figsize=(8, 6))
-        plt.plot(fpr, tpr, color='blue', label='ROC Curve (AUC = %0.2f)' % roc_auc)
-        plt.plot([0, 1], [0, 1], color='black', linestyle='--')
-        plt.xlabel('False Positive Rate')
-        plt.ylabel('True Positive Rate')
-        plt.title('Receiver Operating Characteristic (ROC) Curve', fontsize=16, fontweight='bold')
-        plt.legend(loc='lower right')
-        plt.xlim([0, 1])
-        plt.ylim([0, 1])
-        plt.grid(linestyle='--', alpha=0.8)
-        plt.show()
-
-        # plot how strong the top N features correlate to the target
-        top_n_features = self.data_df.corrwith(self.data_df['target']).abs().sort_values(ascending=False)[1:n+1]
-        bar_colors = ['red' if val < 0 else 'green' for val in top_n_features.values]
-        plt.figure(figsize=(10, 8))
-        plt.barh(y=top_n_features.index, width=top_n_features.values, color=bar_colors)
-        plt.xlabel('Correlation value to Target')
-        plt.ylabel('Features')
-        plt.title(f"Top {n} Features' Correlation to Target", fontsize=16, fontweight='bold')
-        plt.xticks(fontsize=12)
-        plt.yticks(fontsize=12)
-        plt.show()
+        tn, fp, fn, tp = results['confusion_matrix'].ravel()
 
         # add to evaluation metrics dataframe
         self.evaluation_metrics = pd.DataFrame({
             'Metric' : ['Accuracy', 'Precision', 'Recall', 'F1 Score', 'True Positives', 'True Negatives',
                         'False Positives', 'False Negatives', 'ROC AUC Score'],
-            'Value' : [accuracy, precision, recall, f1, float(tp), float(tn), float(fp), float(fn), roc_auc]})
+            'Value' : [results['accuracy'], results['precision'], results['recall'], results['f1'],
+                       float(tp), float(tn), float(fp), float(fn), results['roc_auc']]})
+        return results
 
 
-    def cross_validate_model(self) -> None:
+    def _evaluation_figures(self, results: dict, n: int, output_dir: str | None) -> list[tuple]:
+        """
+        Lists the evaluation figures as (plot function, arguments, file path) so they
+        can be drawn here or in worker processes.
         """
-        To further evaluate the model, this function performs 5-fold cross validation on it.
+        def path(name: str) -> str | None:
+            return os.path.join(output_dir, name) if output_dir is not None else None
+
+        return [(plot_confusion_matrix, (results['confusion_matrix'],), path('Confusion_Matrix.png')),
+                (plot_roc_curve, (results['fpr'], results['tpr'], results['roc_auc']), path('ROC_Curve.png')),
+                (plot_top_features, (self.top_features(n), n), path('Top_Features_Correlation_To_Target.png'))]
+
+
+    def evaluation_report(self,
+                          output_dir: str,
+                          n: int = 10,
+                          cross_validate_folds: bool = True,
+                          n_jobs: int | None = None) -> str:
         """
-        cv_scores = cross_val_score(self.model, self.data.data, self.data.target)
-        self.evaluation_metrics.loc[len(self.evaluation_metrics)] = ['Mean Cross-Validation Score', np.mean(cv_scores)]
-        # NOTE: I'm not sure how to store this yet
-        # print("Cross-validation Scores:", cv_scores)
+        Headless batch evaluation: trains and evaluates the model, optionally cross
+        validates it, then renders every figure to output_dir with a non-interactive
+        backend in a pool of worker processes and writes the metrics file there.
+        Nothing is shown on screen, so this works on servers without a display.
 
+        Input:
+            output_dir: folder for the figures and metrics file (created if needed)
+            n: number of features in the top features plot
+            cross_validate_folds: also run cross_validate_model
+            n_jobs: number of worker processes for rendering (defaults to cpu count)
 
-    def evaluation_scores_file(self):
+        Output: path of the metrics file
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        results = self._evaluation_results()
+        if cross_validate_folds:
+            self.cross_validate_model()
+
+        figures = [(plot_class_distribution, (self.profile.class_counts,), os.path.join(output_dir, 'Class_Distribution.png')),
+                   (plot_correlation_matrix, (self.strongest_features_corr(10),),
+                    os.path.join(output_dir, 'Correlation_Matrix.png')),
+                   *self._evaluation_figures(results, n, output_dir)]
+
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_use_headless_backend) as pool:
+            futures = [pool.submit(plot_function, *args, path) for plot_function, args, path in figures]
+            for future in futures:
+                future.result()
+
+        return self.evaluation_scores_file(os.path.join(output_dir, 'Evaluation_Metric_Scores.txt'))
+
+
+    def cross_validate_model(self,
+                             n_splits: int = 10,
+                             n_repeats: int = 10,
+                             n_jobs: int = -1,
+                             confidence: float = 0.95) -> pd.DataFrame:
+        """
+        To further evaluate the model, this function performs repeated stratified k-fold
+        cross validation on it. The scaler is fit inside every fold (on that fold's
+        training data only) and the folds run in parallel on all cores.
+
+        The per-fold scores are saved in self.cv_scores and the mean score, its
+        confidence interval, standard deviation and timing are added to
+        self.evaluation_metrics.
+
+        Note: the confidence interval uses a t-distribution over all folds, which is
+        optimistic because the repeated folds overlap.
+
+        Input:
+            n_splits: number of folds
+            n_repeats: number of times the folds are reshuffled and rerun
+            n_jobs: number of parallel jobs (-1 for all cores)
+            confidence: confidence level of the interval
+
+        Output: dataframe with the repeat, fold, accuracy score and timing of every fold
+        """
+        params = {'model': type(self.model).__name__,
+                  'params': clone(self.model).get_params(),
+                  'scaler': self.scaler.get_params(),
+                  'n_splits': n_splits,
+                  'n_repeats': n_repeats}
+        self.cv_scores, cv_seconds = self._run_stage('cross_validate', params, ['profile'],
+                                                     lambda: self._cross_validate_stage(n_splits, n_repeats, n_jobs))
+
+        scores = self.cv_scores['score'].to_numpy()
+        mean = float(np.mean(scores))
+        std = float(np.std(scores, ddof=1))
+        margin = stats.t.ppf((1 + confidence) / 2, df=len(scores) - 1) * std / np.sqrt(len(scores))
+
+        cv_metrics = pd.DataFrame({
+            'Metric': ['Mean Cross-Validation Score',
+                       f'Cross-Validation Score {confidence:.0%} CI Lower',
+                       f'Cross-Validation Score {confidence:.0%} CI Upper',
+                       'Cross-Validation Score Std',
+                       'Cross-Validation Wall Time (s, cached)' if self.stage_cached['cross_validate']
+                       else 'Cross-Validation Wall Time (s)'],
+            'Value': [mean, mean - margin, mean + margin, std, cv_seconds]})
+        if not hasattr(self, 'evaluation_metrics'):
+            self.evaluation_metrics = cv_metrics
+        else:
+            self.evaluation_metrics = pd.concat([self.evaluation_metrics, cv_metrics], ignore_index=True)
+
+        return self.cv_scores
+
+
+    def _cross_validate_stage(self, n_splits: int, n_repeats: int, n_jobs: int) -> tuple[pd.DataFrame, float]:
+        """
+        Stage 'cross_validate': per-fold scores of a scaler + model pipeline and the
+        wall clock time of the whole cross validation.
+        """
+        pipeline = Pipeline([('scaler', clone(self.scaler)), ('model', clone(self.model))])
+        folds = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats, random_state=1)
+
+        start = time.perf_counter()
+        results = cross_validate(pipeline, self.data.data, self.data.target,
+                                 scoring='accuracy', cv=folds, n_jobs=n_jobs)
+        cv_seconds = time.perf_counter() - start
+
+        num_folds = n_splits * n_repeats
+        cv_scores = pd.DataFrame({'repeat': np.arange(num_folds) // n_splits,
+                                  'fold': np.arange(num_folds) % n_splits,
+                                  'score': results['test_score'],
+                                  'fit_time': results['fit_time'],
+                                  'score_time': results['score_time']})
+        return cv_scores, cv_seconds
+
+
+    def evaluation_scores_file(self, path: str | None = None) -> str:
         """
         This function creates a csv file containing the evaluation metric scores:
             - Accuracy Score
@@ -242,24 +759,49 @@ class BreastCancerClassificationModel:
             - Cross Validation Scores
             - Mean Cross Validation Score
 
+        Input:
+            path: file to write (defaults to Evaluation_Metric_Scores.txt next to this file)
+
         Output:
-            CSV file to current directory
+            path of the tab separated csv file
         """
+        if path is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Evaluation_Metric_Scores.txt')
+
         # create a csv for these evaluation metrics
-        self.evaluation_metrics.to_csv('~/Desktop/coding/ML_Projects/Logistic_Regression/Evaluation_Metric_Scores.txt',
-                                       sep='\t', index=False,
-                                       float_format='%.3f')
+        self.evaluation_metrics.to_csv(path, sep='\t', index=False, float_format='%.3f')
+        return path
 
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description='Logistic regression on the breast cancer dataset')
+    parser.add_argument('--headless', metavar='OUTPUT_DIR',
+                        help='save the figures and metrics to OUTPUT_DIR instead of showing them')
+    parser.add_argument('--engine', choices=['sklearn', 'native'], default='sklearn',
+                        help='logistic regression implementation to train')
+    parser.add_argument('--search', action='store_true',
+                        help='search for the best C and solver before training')
+    args = parser.parse_args()
+
     cancer_data = load_breast_cancer()
-    model = BreastCancerClassificationModel(cancer_data, 3000)
-
-    model.visualize_data()
-    model.feature_correlation()
-    model.preprocess_data()
-    model.train_model()
-    model.evaluate_model()
-    model.cross_validate_model()
-    model.evaluation_scores_file()
+    model = BreastCancerClassificationModel(cancer_data, 3000, engine=args.engine)
+    if args.search:
+        search = model.search_model()
+        solver = search['best_solver'] if args.engine == 'sklearn' else 'native'
+        print(f"Best model: solver={solver} C={search['best_C']:.4g} "
+              f"(cv accuracy {search['best_score']:.3f}, {search['fits']} fits "
+              f"instead of {search['grid_search_fits']} for a grid search"
+              f"{', cached result' if search['cached'] else ''})")
+
+    if args.headless:
+        print(f"Evaluation report written to {model.evaluation_report(args.headless)}")
+    else:
+        model.visualize_data()
+        model.feature_correlation()
+        model.preprocess_data()
+        model.train_model()
+        model.evaluate_model()
+        model.cross_validate_model()
+        model.evaluation_scores_file()
+        model.export_model()
@@ -0,0 +1,168 @@
+"""
+Hyperparameter search for the breast cancer logistic regression model.
+
+Every candidate is a (solver, C) pair. Instead of cross validating every candidate
+on every fold like a grid search, the search runs successive halving:
+    round 0: every candidate is scored on min_folds folds
+    round r: only the best 1 / eta of the candidates are kept and they are scored
+             on eta times as many folds (the folds scored in earlier rounds are reused)
+until one candidate is left or every fold has been used.
+
+Inside a fold, the candidates of a solver are fit along a regularization path:
+one LogisticRegression with warm_start=True is fit for C from smallest (strongest
+regularization) to largest, so every fit starts from the previous coefficients
+and only needs a few iterations. The (solver, fold) paths run in parallel.
+
+Example:
+    fits, summary = successive_halving_search(x_train, y_train)
+    model = LogisticRegression(solver=summary['best_solver'], C=summary['best_C'])
+"""
+
+import itertools
+import math
+import time
+import warnings
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import RepeatedStratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+DEFAULT_CS = tuple(np.logspace(-3, 3, 13))
+# solvers that can warm start from the previous coefficients (liblinear can't)
+DEFAULT_SOLVERS = ('lbfgs', 'newton-cg', 'saga')
+
+
+def regularization_path(x: npt.NDArray,
+                        y: npt.NDArray,
+                        train_idx: npt.NDArray,
+                        val_idx: npt.NDArray,
+                        solver: str,
+                        Cs: list[float],
+                        max_iter: int = 1000,
+                        random_state: int | None = 1) -> list[dict]:
+    """
+    Fits one solver for every C on a fold's training data, warm starting each fit
+    from the coefficients of the previous C, and scores it on the fold's
+    validation data. The scaler is fit on the training data only.
+
+    Inputs:
+        x: data (not scaled)
+        y: target values
+        train_idx: indices of the fold's training samples
+        val_idx: indices of the fold's validation samples
+        solver: LogisticRegression solver
+        Cs: inverse regularization strengths (fit from smallest to largest)
+        max_iter: maximum iterations of every fit
+        random_state: seed for the solvers that shuffle the data
+
+    Output: one dictionary per C with the validation accuracy, iterations and fit time
+    """
+    scaler = StandardScaler().fit(x[train_idx])
+    x_train, y_train = scaler.transform(x[train_idx]), y[train_idx]
+    x_val, y_val = scaler.transform(x[val_idx]), y[val_idx]
+
+    model = LogisticRegression(solver=solver, max_iter=max_iter, warm_start=True, random_state=random_state)
+    results = []
+    with warnings.catch_warnings():
+        # a fit that hits max_iter is still scored, its iterations are reported
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        for C in sorted(Cs):
+            start = time.perf_counter()
+            model.set_params(C=C).fit(x_train, y_train)
+            results.append({'solver': solver,
+                            'C': C,
+                            'score': model.score(x_val, y_val),
+                            'n_iter': int(np.max(model.n_iter_)),
+                            'fit_time': time.perf_counter() - start})
+    return results
+
+
+def successive_halving_search(x: npt.NDArray,
+                              y: npt.NDArray,
+                              Cs: tuple[float, ...] = DEFAULT_CS,
+                              solvers: tuple[str, ...] = DEFAULT_SOLVERS,
+                              eta: int = 3,
+                              min_folds: int = 1,
+                              n_splits: int = 5,
+                              n_repeats: int = 3,
+                              max_iter: int = 1000,
+                              n_jobs: int = -1,
+                              random_state: int | None = 1) -> tuple[pd.DataFrame, dict]:
+    """
+    Finds the best (solver, C) pair with successive halving over repeated stratified
+    k-fold cross validation (see the module docstring).
+
+    Inputs:
+        x: data (not scaled, the scaler is fit inside every fold)
+        y: target values
+        Cs: inverse regularization strengths to try
+        solvers: LogisticRegression solvers to try
+        eta: only the best 1 / eta of the candidates survive each round
+        min_folds: number of folds every candidate is scored on in the first round
+        n_splits: number of folds
+        n_repeats: number of times the folds are reshuffled
+        max_iter: maximum iterations of every fit
+        n_jobs: number of parallel jobs (-1 for all cores)
+        random_state: seed for the folds and the solvers
+
+    Outputs:
+        fits: dataframe with the round, fold, solver, C, accuracy, iterations and
+              fit time of every fit
+        summary: best solver, C and mean score, the candidates and folds of every
+                 round, and how many fits were run compared to a full grid search
+    """
+    if eta < 2:
+        raise ValueError(f"eta must be at least 2, not {eta}")
+
+    splits = list(RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats,
+                                          random_state=random_state).split(x, y))
+    candidates = [(solver, float(C)) for solver in solvers for C in Cs]
+    fits = []
+    rounds = []
+    folds_done = 0
+
+    start = time.perf_counter()
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for round_ in itertools.count():
+            num_folds = min(min_folds * eta**round_, len(splits))
+
+            # new folds for the surviving candidates, one warm started path per (solver, fold)
+            paths = {solver: [C for s, C in candidates if s == solver] for solver in solvers}
+            jobs = [(fold, solver, path) for fold in range(folds_done, num_folds)
+                    for solver, path in paths.items() if path]
+            results = parallel(delayed(regularization_path)(x, y, *splits[fold], solver, path,
+                                                            max_iter, random_state)
+                               for fold, solver, path in jobs)
+            for (fold, _, _), path_results in zip(jobs, results):
+                fits.extend(dict(result, round=round_, fold=fold) for result in path_results)
+            folds_done = num_folds
+
+            # mean score of every candidate over all the folds it has been scored on
+            scores = pd.DataFrame(fits).groupby(['solver', 'C'])['score'].mean()
+            ranked = sorted(candidates, key=lambda candidate: (-scores[candidate], candidate[1]))
+            rounds.append({'round': round_,
+                           'candidates': len(candidates),
+                           'folds': num_folds,
+                           'fits': sum(len(path) for _, _, path in jobs)})
+
+            if len(candidates) == 1 or num_folds == len(splits):
+                candidates = ranked[:1]
+                break
+            candidates = ranked[:max(1, math.ceil(len(candidates) / eta))]
+
+    fits = pd.DataFrame(fits)[['round', 'fold', 'solver', 'C', 'score', 'n_iter', 'fit_time']]
+    best_solver, best_C = candidates[0]
+    summary = {'best_solver': best_solver,
+               'best_C': best_C,
+               'best_score': float(scores[(best_solver, best_C)]),
+               'best_folds': folds_done,
+               'rounds': rounds,
+               'fits': len(fits),
+               'grid_search_fits': len(solvers) * len(Cs) * len(splits),
+               'seconds': time.perf_counter() - start}
+    return fits, summary
+